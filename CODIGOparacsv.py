@@ -1,122 +1,458 @@
-import csv
 from math import inf
-from collections import defaultdict, deque
+from collections import deque
 import heapq
+import time
+from carregador import load_graph_from_csv  # reexportado (GUI, benchmarks, scripts)
+from cache_heuristica import HEURISTIC_CACHE
+from multiobjetivo import constrained_routes, pareto_routes
+from matriz_rotas import route_matrix, recover_path
+from landmarks import reverse_adjacency
+from grafo_compacto import CompactGraph
+from contexto_pesquisa import context_for
+from conectividade import connected
+from estatisticas import collects_stats, timed
+from cache_rotas import cached_routes
 
 class Graph:
-    def __init__(self, adjacency_list):
+    def __init__(self, adjacency_list, landmarks=None, heuristic_cache=HEURISTIC_CACHE,
+                 route_cache=None):
         self.adjacency_list = adjacency_list
+        self.landmarks = landmarks
+        self.heuristic_cache = heuristic_cache
+        self.route_cache = route_cache
         self.heuristic = {}
+        self.reverse_adjacency = None
+        self.last_expansions = {}
+        self.stats = None
+        self.on_expand = None
+        self.on_relax = None
     
     def get_neighbors(self, node):
         return self.adjacency_list.get(node, [])
     
-    def initialize_heuristic(self, goal):
+    def compute_heuristic(self, goal):
         """Inicialização da heurística usando BFS"""
-        self.heuristic = {node: inf for node in self.adjacency_list}
-        self.heuristic[goal] = 0
+        if isinstance(self.adjacency_list, CompactGraph) and goal in self.adjacency_list:
+            return self.adjacency_list.propagate_distances(goal)
+        heuristic = {node: inf for node in self.adjacency_list}
+        heuristic[goal] = 0
         
         queue = deque([goal])
         while queue:
             current = queue.popleft()
             for neighbor, costs in self.get_neighbors(current):
-                if self.heuristic[neighbor] > self.heuristic[current] + costs[2]:
-                    self.heuristic[neighbor] = self.heuristic[current] + costs[2]
+                if heuristic[neighbor] > heuristic[current] + costs[2]:
+                    heuristic[neighbor] = heuristic[current] + costs[2]
                     queue.append(neighbor)
+        return heuristic
     
-    def a_star(self, start, goal):
-        """Implementação do algoritmo A*"""
-        open_set = []
-        heapq.heappush(open_set, (0, start))
+    @timed("heuristic_time")
+    def initialize_heuristic(self, goal):
+        """Heurística do objetivo (landmarks ALT, cache global ou cálculo direto)"""
+        if self.landmarks is not None:
+            # ALT: limites derivados dos landmarks em O(#landmarks) por nó
+            self.heuristic = self.landmarks.heuristic_for(goal)
+            return
         
-        came_from = {}
+        if self.heuristic_cache is None:
+            self.heuristic = self.compute_heuristic(goal)
+        else:
+            table = self.heuristic_cache.get_or_compute(
+                self.adjacency_list, goal, self.compute_heuristic)
+            self.heuristic = table
+    
+    @timed("search_time")
+    def a_star(self, start, goal, blocked_nodes=(), blocked_edges=()):
+        """Implementação do algoritmo A* (nós/arestas bloqueados são ignorados)
         
-        g_score = {node: inf for node in self.adjacency_list}
-        g_score[start] = 0
+        O estado vive num SearchContext reutilizado entre pesquisas (reset O(1)),
+        por isso só os nós visitados têm custo; entradas obsoletas da heap são
+        ignoradas ao sair em vez de se procurar o nó na lista aberta.
+        Cidades em componentes diferentes são rejeitadas logo (conectividade)."""
+        if not connected(self.adjacency_list, start, goal):
+            return (None, None, None, None)
+        ctx = context_for(self.adjacency_list)
+        ctx.reset()
+        ids, names = ctx.ids, ctx.names
+        if start not in ids or goal not in ids:
+            return (None, None, None, None)
         
-        f_score = {node: inf for node in self.adjacency_list}
-        f_score[start] = self.heuristic[start]
+        source, target = ids[start], ids[goal]
+        blocked = {ids[node] for node in blocked_nodes if node in ids}
+        blocked_pairs = {(ids[u], ids[v]) for u, v in blocked_edges if u in ids and v in ids}
+        heuristic = self.heuristic
         
-        toll_values = {node: 0 for node in self.adjacency_list}
-        fuel_values = {node: 0 for node in self.adjacency_list}
-        distance_values = {node: 0 for node in self.adjacency_list}
+        graph = self.adjacency_list
+        compact = isinstance(graph, CompactGraph)
+        if compact:
+            targets, tolls, fuels, dists = graph.targets, graph.toll, graph.fuel, graph.dist
+        
+        stats, on_expand, on_relax = self.stats, self.on_expand, self.on_relax
+        
+        ctx.record(source, 0, -1, 0, 0, 0)
+        open_set = [(heuristic[start], 0, source)]
         
         while open_set:
-            _, current = heapq.heappop(open_set)
+            _, g_current, current = heapq.heappop(open_set)
+            if g_current > ctx.g[current] or ctx.is_closed(current):
+                if stats is not None:
+                    stats.heap_pops += 1
+                    stats.stale_pops += 1
+                continue
+            ctx.close(current)
+            if stats is not None:
+                stats.heap_pops += 1
+                stats.expanded += 1
+            if on_expand is not None:
+                on_expand(names[current])
             
-            if current == goal:
+            if current == target:
                 # Reconstruir o caminho
-                path = []
-                total_toll = toll_values[current]
-                total_fuel = fuel_values[current]
-                total_distance = distance_values[current]
-                
-                while current in came_from:
-                    path.append(current)
-                    current = came_from[current]
-                path.append(start)
-                path.reverse()
-                
-                return (path, total_toll, total_fuel, total_distance)
+                return (ctx.path_to(current), ctx.toll[current],
+                        ctx.fuel[current], ctx.dist[current])
             
-            for neighbor, costs in self.get_neighbors(current):
-                tentative_g_score = g_score[current] + costs[2]
+            toll, fuel, distance = ctx.toll[current], ctx.fuel[current], ctx.dist[current]
+            if compact:
+                edges = ((targets[e], tolls[e], fuels[e], dists[e])
+                         for e in graph.edge_range(current))
+            else:
+                edges = ((ids[neighbor], costs[0], costs[1], costs[2])
+                         for neighbor, costs in self.get_neighbors(names[current]))
+            
+            for neighbor, edge_toll, edge_fuel, edge_dist in edges:
+                if neighbor in blocked or (current, neighbor) in blocked_pairs:
+                    continue
+                tentative_g_score = g_current + edge_dist
+                if stats is not None:
+                    stats.relaxations += 1
+                if on_relax is not None:
+                    on_relax(names[current], names[neighbor], tentative_g_score)
                 
-                if tentative_g_score < g_score[neighbor]:
-                    came_from[neighbor] = current
-                    g_score[neighbor] = tentative_g_score
-                    f_score[neighbor] = tentative_g_score + self.heuristic[neighbor]
-                    toll_values[neighbor] = toll_values[current] + costs[0]
-                    fuel_values[neighbor] = fuel_values[current] + costs[1]
-                    distance_values[neighbor] = distance_values[current] + costs[2]
-                    
-                    if neighbor not in [node for (_, node) in open_set]:
-                        heapq.heappush(open_set, (f_score[neighbor], neighbor))
+                if tentative_g_score < ctx.g_of(neighbor):
+                    if ctx.is_closed(neighbor):
+                        ctx.reopen(neighbor)
+                    ctx.record(neighbor, tentative_g_score, current, toll + edge_toll,
+                               fuel + edge_fuel, distance + edge_dist)
+                    f_score = tentative_g_score + heuristic[names[neighbor]]
+                    heapq.heappush(open_set, (f_score, tentative_g_score, neighbor))
+                    if stats is not None:
+                        stats.heap_pushes += 1
+                        stats.observe_open(len(open_set))
         
         return (None, None, None, None)
     
-    def find_top_paths(self, start, goal, num_paths=5, max_attempts=30):
-        """Versão otimizada para encontrar os melhores caminhos com A*"""
-        paths = []
-        attempts = 0
+    @timed("search_time")
+    def bidirectional_a_star(self, start, goal):
+        """A* bidirecional com potenciais médios consistentes.
         
-        self.initialize_heuristic(goal)
+        O potencial de avanço é (h(v, goal) - h(start, v)) / 2 (limites ALT se houver
+        landmarks, senão 0, ou seja, Dijkstra bidirecional) e o de recuo é o seu
+        simétrico. Pára quando a soma dos topos das duas filas atinge o melhor
+        caminho encontrado. Os nós expandidos por sentido ficam em last_expansions."""
+        if start == goal:
+            self.last_expansions = {"forward": 0, "backward": 0}
+            return ([start], 0, 0, 0)
+        if not connected(self.adjacency_list, start, goal):
+            self.last_expansions = {"forward": 0, "backward": 0}
+            return (None, None, None, None)
+        if self.reverse_adjacency is None:
+            self.reverse_adjacency = reverse_adjacency(self.adjacency_list)
         
-        while len(paths) < num_paths and attempts < max_attempts:
-            attempts += 1
-            path, toll, fuel, dist = self.a_star(start, goal)
+        if self.landmarks is None:
+            potential = lambda node: 0
+        else:
+            bound = self.landmarks.bound
+            potential = lambda node: (bound(node, goal) - bound(start, node)) / 2
+        
+        graphs = (self.adjacency_list, self.reverse_adjacency)
+        signs = (1, -1)
+        g_score = ({start: 0}, {goal: 0})
+        parents = ({start: None}, {goal: None})
+        closed = (set(), set())
+        open_sets = ([(potential(start), start)], [(-potential(goal), goal)])
+        expansions = [0, 0]
+        best, meeting = inf, None
+        stats, on_expand, on_relax = self.stats, self.on_expand, self.on_relax
+        
+        while open_sets[0] and open_sets[1]:
+            if open_sets[0][0][0] + open_sets[1][0][0] >= best:
+                break
             
-            if path:
-                path_tuple = tuple(path)
-                if not any(path_tuple == tuple(p[1]) for p in paths):
-                    heapq.heappush(paths, (dist, path, toll, fuel))
-                    if len(paths) > num_paths:
-                        heapq.heappop(paths)
-        
-        paths_sorted = sorted(paths, key=lambda x: (x[0], x[2], x[3]))
-        return [(p[1], p[2], p[3], p[0]) for p in paths_sorted]
+            side = 0 if open_sets[0][0][0] <= open_sets[1][0][0] else 1
+            _, current = heapq.heappop(open_sets[side])
+            if stats is not None:
+                stats.heap_pops += 1
+            if current in closed[side]:
+                if stats is not None:
+                    stats.stale_pops += 1
+                continue
+            closed[side].add(current)
+            expansions[side] += 1
+            if stats is not None:
+                stats.expanded += 1
+            if on_expand is not None:
+                on_expand(current)
+            
+            g_current = g_score[side][current]
+            for neighbor, costs in graphs[side].get(current, []):
+                tentative_g_score = g_current + costs[2]
+                if stats is not None:
+                    stats.relaxations += 1
+                if on_relax is not None:
+                    on_relax(current, neighbor, tentative_g_score)
+                if tentative_g_score < g_score[side].get(neighbor, inf):
+                    g_score[side][neighbor] = tentative_g_score
+                    parents[side][neighbor] = (current, costs)
+                    key = tentative_g_score + signs[side] * potential(neighbor)
+                    heapq.heappush(open_sets[side], (key, neighbor))
+                    if stats is not None:
+                        stats.heap_pushes += 1
+                        stats.observe_open(len(open_sets[0]) + len(open_sets[1]))
+                    
+                    other = g_score[1 - side].get(neighbor)
+                    if other is not None and tentative_g_score + other < best:
+                        best, meeting = tentative_g_score + other, neighbor
+        
+        self.last_expansions = {"forward": expansions[0], "backward": expansions[1]}
+        if meeting is None:
+            return (None, None, None, None)
+        
+        # Junta as duas metades: start -> meeting (avanço) e meeting -> goal (recuo)
+        toll = fuel = distance = 0
+        halves = ([], [])
+        for side in (0, 1):
+            node = meeting
+            while parents[side][node] is not None:
+                node, costs = parents[side][node]
+                toll += costs[0]
+                fuel += costs[1]
+                distance += costs[2]
+                halves[side].append(node)
+        path = halves[0][::-1] + [meeting] + halves[1]
+        
+        return (path, toll, fuel, distance)
+    
+    def ara_star(self, start, goal, epsilon=3.0, epsilon_step=0.5, deadline=None):
+        """Anytime Repairing A* (ARA*): gera (caminho, portagem, combustível, distância, limite)
+        com limite decrescente até 1 (ótimo), ou até se esgotar deadline (segundos)"""
+        started = time.perf_counter()
+        expires = None if deadline is None else started + deadline
+        if not connected(self.adjacency_list, start, goal, build=expires is None):
+            return
 
-def load_graph_from_csv(filename):
-    """Carrega o grafo do CSV com tratamento robusto de erros"""
-    adjacency_list = defaultdict(list)
-    try:
-        with open(filename, newline='', encoding='utf-8') as csvfile:
-            reader = csv.reader(csvfile)
-            next(reader)  # Pula cabeçalho
-            for row in reader:
-                if len(row) < 5:
-                    continue
-                origem, destino, custo, combustivel, distancia = row
-                try:
-                    custos = (float(custo), float(combustivel), float(distancia))
-                except ValueError:
+        if self.landmarks is not None:
+            alt = self.landmarks.heuristic_for(goal)
+            heuristic = lambda node: alt.get(node, inf)
+        else:
+            heuristic = lambda node: 0
+        stats, on_expand, on_relax = self.stats, self.on_expand, self.on_relax
+        g_score = {start: 0}
+        parents = {start: None}
+        open_keys = {}      # nó -> chave atual na heap (as restantes entradas são obsoletas)
+        open_set = []
+        closed = set()
+        incons = set()
+
+        def push(node, eps):
+            h = heuristic(node)
+            if h == inf:
+                return
+            key = g_score[node] + eps * h
+            open_keys[node] = key
+            heapq.heappush(open_set, (key, node))
+            if stats is not None:
+                stats.heap_pushes += 1
+                stats.observe_open(len(open_set))
+
+        def improve_path(eps):
+            """Expande enquanto a chave mínima for inferior a g(goal); False se o prazo acabou"""
+            while open_set:
+                key, current = open_set[0]
+                if open_keys.get(current) != key:
+                    heapq.heappop(open_set)
+                    if stats is not None:
+                        stats.heap_pops += 1
+                        stats.stale_pops += 1
                     continue
-                adjacency_list[origem].append((destino, custos))
-                adjacency_list[destino].append((origem, custos))
-    except FileNotFoundError:
-        print(f"Erro: Arquivo '{filename}' não encontrado.")
-        return None
-    return adjacency_list
+                if key >= g_score.get(goal, inf):
+                    return True
+                if expires is not None and time.perf_counter() > expires:
+                    return False
+
+                heapq.heappop(open_set)
+                del open_keys[current]
+                closed.add(current)
+                if stats is not None:
+                    stats.heap_pops += 1
+                    stats.expanded += 1
+                if on_expand is not None:
+                    on_expand(current)
+
+                g_current = g_score[current]
+                for neighbor, costs in self.get_neighbors(current):
+                    tentative_g_score = g_current + costs[2]
+                    if stats is not None:
+                        stats.relaxations += 1
+                    if on_relax is not None:
+                        on_relax(current, neighbor, tentative_g_score)
+                    if tentative_g_score < g_score.get(neighbor, inf):
+                        g_score[neighbor] = tentative_g_score
+                        parents[neighbor] = (current, costs)
+                        if neighbor in closed:
+                            incons.add(neighbor)
+                        else:
+                            push(neighbor, eps)
+            return True
+
+        def solution(eps):
+            # Limite de subotimalidade: g(goal) / min(g + h) sobre OPEN ∪ INCONS
+            lower = min((g_score[node] + heuristic(node)
+                         for node in (*open_keys, *incons)), default=inf)
+            if g_score[goal] == 0:
+                bound = 1.0   # custo 0 (ex.: origem == destino) é sempre ótimo
+            elif lower > 0:
+                bound = max(1.0, min(eps, g_score[goal] / lower))
+            else:
+                bound = eps
+
+            path, toll, fuel, distance = [goal], 0, 0, 0
+            node = goal
+            while parents[node] is not None:
+                node, costs = parents[node]
+                toll += costs[0]
+                fuel += costs[1]
+                distance += costs[2]
+                path.append(node)
+            return (path[::-1], toll, fuel, distance, bound)
+
+        eps = max(1.0, epsilon)
+        push(start, eps)
+        previous = None
+        while True:
+            searched = time.perf_counter()
+            finished = improve_path(eps)
+            if stats is not None:
+                stats.search_time += time.perf_counter() - searched
+            if not finished:
+                return
+            if goal not in g_score:
+                return
+
+            result = solution(eps)
+            # Só se produz uma solução quando o caminho ou o limite melhoram
+            if previous is None or result[3] < previous[3] or result[4] < previous[4]:
+                yield result
+                previous = result
+            if result[4] <= 1.0:
+                return
+
+            # Próxima iteração: menos inflação, INCONS volta à OPEN, CLOSED esvazia
+            eps = max(1.0, eps - epsilon_step)
+            for node in incons:
+                open_keys[node] = None
+            incons.clear()
+            closed.clear()
+            open_set.clear()
+            for node in list(open_keys):
+                push(node, eps)
+
+    def edge_costs(self, u, v):
+        """Custos da aresta u -> v (a de menor distância, se houver várias)"""
+        best = None
+        for neighbor, costs in self.get_neighbors(u):
+            if neighbor == v and (best is None or costs[2] < best[2]):
+                best = costs
+        return best
+    
+    def k_shortest_paths(self, start, goal, k=5):
+        """Algoritmo de Yen: k caminhos simples mais curtos, ordenados por distância.
+        
+        A heurística do objetivo é calculada uma só vez e reaproveitada em todas
+        as pesquisas de desvio (bloquear nós/arestas só aumenta as distâncias
+        reais, por isso continua admissível)."""
+        if self.heuristic.get(goal) != 0:
+            self.initialize_heuristic(goal)
+        
+        first = self.a_star(start, goal)
+        if first[0] is None:
+            return []
+        
+        found = [first]
+        candidates = []
+        seen = {tuple(first[0])}
+        
+        while len(found) < k:
+            prev_path = found[-1][0]
+            root_toll = root_fuel = root_dist = 0
+            
+            for i in range(len(prev_path) - 1):
+                spur_node = prev_path[i]
+                root_path = prev_path[:i + 1]
+                
+                blocked_edges = set()
+                for path, _, _, _ in found:
+                    if len(path) > i + 1 and path[:i + 1] == root_path:
+                        blocked_edges.add((path[i], path[i + 1]))
+                blocked_nodes = set(root_path[:-1])
+                
+                spur_path, toll, fuel, dist = self.a_star(
+                    spur_node, goal, blocked_nodes, blocked_edges)
+                
+                if spur_path is not None:
+                    total_path = root_path[:-1] + spur_path
+                    path_tuple = tuple(total_path)
+                    if path_tuple not in seen:
+                        seen.add(path_tuple)
+                        heapq.heappush(candidates, (
+                            root_dist + dist, root_toll + toll, root_fuel + fuel, total_path))
+                
+                costs = self.edge_costs(spur_node, prev_path[i + 1])
+                root_toll += costs[0]
+                root_fuel += costs[1]
+                root_dist += costs[2]
+            
+            if not candidates:
+                break
+            dist, toll, fuel, path = heapq.heappop(candidates)
+            found.append((path, toll, fuel, dist))
+        
+        return found
+    
+    @cached_routes("A*")
+    @collects_stats
+    def find_top_paths(self, start, goal, num_paths=5, max_attempts=30, with_stats=False,
+                       max_toll=None, max_fuel=None):
+        """Encontra os melhores caminhos distintos com A* + Yen
+        
+        max_attempts é mantido apenas por compatibilidade: o custo depende de
+        num_paths, não do número de tentativas. Com with_stats=True devolve
+        (caminhos, SearchStats). Com max_toll/max_fuel devolve os caminhos
+        mais curtos dentro desses orçamentos (ver constrained_paths)."""
+        if not connected(self.adjacency_list, start, goal):
+            return []
+        if max_toll is not None or max_fuel is not None:
+            return self.constrained_paths(start, goal, max_toll, max_fuel, num_paths)
+        self.initialize_heuristic(goal)
+        paths = self.k_shortest_paths(start, goal, num_paths)
+        return sorted(paths, key=lambda p: (p[3], p[1], p[2]))
+    
+    @timed("search_time")
+    def constrained_paths(self, start, goal, max_toll=None, max_fuel=None, k=1):
+        """Caminhos mais curtos com portagem <= max_toll e combustível <= max_fuel.
+        
+        Devolve até k rotas viáveis e não dominadas, por ordem de distância;
+        [] se não houver nenhuma (orçamentos impossíveis são detetados logo)."""
+        if not connected(self.adjacency_list, start, goal):
+            return []
+        return constrained_routes(
+            self.adjacency_list, start, goal,
+            inf if max_toll is None else max_toll, inf if max_fuel is None else max_fuel,
+            k, self.heuristic_cache, self.stats, self.on_expand)
+    
+    def pareto_paths(self, start, goal, max_front=20, epsilon=0.0):
+        """Frente de Pareto (portagem, combustível, distância) com NAMOA*"""
+        return pareto_routes(self.adjacency_list, start, goal, max_front, epsilon,
+                             self.heuristic_cache)
 
 # def main():
 #     filename = "cities_nodes_special.csv"
@@ -1,124 +1,215 @@
-import csv
 from math import inf
-from collections import defaultdict, deque
 import heapq
+from fila_prioridade import IndexedHeap
+from estatisticas import collects_stats, timed
+from carregador import load_graph_from_csv  # reexportado (GUI, benchmarks, scripts)
+from conectividade import connected
+from grafo_compacto import CompactGraph
+from cache_rotas import cached_routes
 
 class Graph:
-    def __init__(self, adjacency_list):
+    def __init__(self, adjacency_list, landmarks=None, heuristic_cache=None,
+                 route_cache=None):
+        # heuristic_cache é aceite como nos outros planeadores, mas o D* Lite não
+        # usa tabelas por objetivo: a chave só precisa de h(origem, nó), ver h()
         self.adjacency_list = adjacency_list
+        self.compact = isinstance(adjacency_list, CompactGraph)
+        self.landmarks = landmarks
+        # Os limites ALT vêm do grafo base: deixam de servir se um custo descer
+        self.use_landmarks = landmarks is not None
+        self.route_cache = route_cache
         self.km = 0
-        self.heuristic = {}
         self.g_values = {}
         self.rhs_values = {}
-        self.open_list = []
-        self.open_list_hash = set()
+        self.open_list = IndexedHeap()
+        self.start = None
+        self.goal = None
+        self.last_start = None
+        self.edge_overrides = {}
+        self.neighbor_cache = {}
+        self.stats = None
+        self.on_expand = None
+        self.on_relax = None
     
     def get_neighbors(self, node):
-        return self.adjacency_list.get(node, [])
+        neighbors = self.adjacency_list.get(node, [])
+        if not self.edge_overrides:
+            return neighbors
+        # Aplica as alterações de custos feitas com update_edge_cost
+        updated = []
+        for neighbor, costs in neighbors:
+            costs = self.edge_overrides.get((node, neighbor), costs)
+            if costs is not None:
+                updated.append((neighbor, costs))
+        return updated
     
-    def initialize_heuristic(self, goal):
-        """Inicialização da heurística usando BFS"""
-        self.heuristic = {node: inf for node in self.adjacency_list}
-        self.heuristic[goal] = 0
+    def neighbor_distances(self, node):
+        """Pares (vizinho, distância) de node, guardados por nó até ao próximo initialize().
         
-        queue = deque([goal])
-        while queue:
-            current = queue.popleft()
-            for neighbor, costs in self.get_neighbors(current):
-                if self.heuristic[neighbor] > self.heuristic[current] + costs[2]:
-                    self.heuristic[neighbor] = self.heuristic[current] + costs[2]
-                    queue.append(neighbor)
+        O D* Lite percorre os vizinhos de cada nó muitas vezes (uma por vizinho
+        atualizado); num CompactGraph os pares saem diretamente das colunas CSR.
+        Com alterações locais (edge_overrides) lê sempre get_neighbors."""
+        if self.edge_overrides:
+            return [(neighbor, costs[2]) for neighbor, costs in self.get_neighbors(node)]
+        pairs = self.neighbor_cache.get(node)
+        if pairs is None:
+            graph = self.adjacency_list
+            if not self.compact:
+                pairs = [(neighbor, costs[2]) for neighbor, costs in graph.get(node, [])]
+            elif node in graph.index:
+                i = graph.index[node]
+                a, b = graph.offsets[i], graph.offsets[i + 1]
+                pairs = list(zip(map(graph.names.__getitem__, graph.targets[a:b]), graph.dist[a:b]))
+            else:
+                pairs = []
+            self.neighbor_cache[node] = pairs
+        return pairs
+    
+    def h(self, a, b):
+        """Estimativa admissível e consistente da distância entre a e b (0 sem landmarks)"""
+        if not self.use_landmarks:
+            return 0
+        return self.landmarks.bound(a, b)
     
     def calculate_key(self, node):
-        """Calcula a chave de prioridade para o D*"""
+        """Calcula a chave de prioridade para o D* Lite"""
         g = self.g_values.get(node, inf)
         rhs = self.rhs_values.get(node, inf)
         min_g_rhs = min(g, rhs)
-        heuristic = self.heuristic.get(node, 0)
-        return (min_g_rhs + heuristic, min_g_rhs)
+        return (min_g_rhs + self.h(self.start, node) + self.km, min_g_rhs)
     
     def update_vertex(self, u):
-        """Atualiza um vértice no algoritmo D*"""
+        """Atualiza um vértice no algoritmo D* Lite"""
         if u != self.goal:
             min_rhs = inf
-            for (v, costs) in self.get_neighbors(u):
-                current_cost = costs[2] + self.g_values.get(v, inf)
+            g_values, stats, on_relax = self.g_values, self.stats, self.on_relax
+            for v, distance in self.neighbor_distances(u):
+                current_cost = distance + g_values.get(v, inf)
+                if stats is not None:
+                    stats.relaxations += 1
+                if on_relax is not None:
+                    on_relax(u, v, current_cost)
                 if current_cost < min_rhs:
                     min_rhs = current_cost
             self.rhs_values[u] = min_rhs
         
-        # Verifica se o nó está na open_list_hash antes de remover
-        if u in self.open_list_hash:
-            self.open_list_hash.remove(u)
-            # Remove da open_list
-            self.open_list = [(k, n) for (k, n) in self.open_list if n != u]
-            heapq.heapify(self.open_list)
-        
         if self.g_values.get(u, inf) != self.rhs_values.get(u, inf):
-            key = self.calculate_key(u)
-            heapq.heappush(self.open_list, (key, u))
-            self.open_list_hash.add(u)
+            self.open_list.push(u, self.calculate_key(u))
+            if self.stats is not None:
+                self.stats.heap_pushes += 1
+                self.stats.observe_open(len(self.open_list))
+        else:
+            self.open_list.remove(u)
     
+    @timed("search_time")
     def compute_shortest_path(self):
-        """Computa o caminho mais curto usando D*"""
+        """Computa o caminho mais curto usando D* Lite"""
+        stats, on_expand = self.stats, self.on_expand
         while self.open_list and (
-            self.open_list[0][0] < self.calculate_key(self.start) or 
+            self.open_list.top_key() < self.calculate_key(self.start) or 
             self.rhs_values.get(self.start, inf) != self.g_values.get(self.start, inf)
         ):
-            _, u = heapq.heappop(self.open_list)
-            if u in self.open_list_hash:  # Verificação adicional de segurança
-                self.open_list_hash.remove(u)
+            k_old, u = self.open_list.top()
+            k_new = self.calculate_key(u)
+            if stats is not None:
+                stats.heap_pops += 1
+            
+            if k_old < k_new:
+                # Chave desatualizada (km mudou): reinsere com a chave nova
+                self.open_list.update(u, k_new)
+                if stats is not None:
+                    stats.stale_pops += 1
+                continue
+            if stats is not None:
+                stats.expanded += 1
+            if on_expand is not None:
+                on_expand(u)
             
             if self.g_values.get(u, inf) > self.rhs_values.get(u, inf):
-                self.g_values[u] = self.rhs_values.get(u, inf)
-                for (v, _) in self.get_neighbors(u):
+                self.g_values[u] = self.rhs_values[u]
+                self.open_list.remove(u)
+                for v, _ in self.neighbor_distances(u):
                     self.update_vertex(v)
             else:
                 self.g_values[u] = inf
                 self.update_vertex(u)
-                for (v, _) in self.get_neighbors(u):
+                for v, _ in self.neighbor_distances(u):
                     self.update_vertex(v)
     
-    def d_star(self, start, goal):
-        """Implementação do algoritmo D*"""
-        self.start = start
+    def initialize(self, start, goal):
+        """Reinicia o planeamento para um novo objetivo"""
+        self.start = self.last_start = start
         self.goal = goal
         self.km = 0
+        self.g_values = {}
+        self.rhs_values = {goal: 0}
+        self.neighbor_cache = {}
+        self.open_list.clear()
+        self.open_list.push(goal, self.calculate_key(goal))
+    
+    def move_start(self, new_start):
+        """Move a origem (ex.: o veículo avançou) mantendo o trabalho já feito"""
+        self.km += self.h(self.last_start, new_start)
+        self.last_start = new_start
+        self.start = new_start
+    
+    def update_edge_cost(self, u, v, costs, both_directions=True):
+        """Altera os custos (portagem, combustível, distância) da aresta u -> v.
         
-        # Inicialização
-        self.g_values = {node: inf for node in self.adjacency_list}
-        self.rhs_values = {node: inf for node in self.adjacency_list}
-        self.rhs_values[goal] = 0
-        
-        self.open_list = []
-        self.open_list_hash = set()
-        heapq.heappush(self.open_list, (self.calculate_key(goal), goal))
-        self.open_list_hash.add(goal)
+        costs=None fecha a estrada. Só os vértices afetados são colocados na
+        lista aberta; o caminho é reparado na próxima chamada a replan()/d_star().
+        Uma distância abaixo da do grafo base desliga os landmarks (h passa a 0)
+        e a pesquisa recomeça, porque as chaves antigas usavam esses limites."""
+        edges = [(u, v), (v, u)] if both_directions else [(u, v)]
+        for a, b in edges:
+            self.edge_overrides[a, b] = costs
         
+        if self.use_landmarks and costs is not None and any(
+                costs[2] < self.base_distance(a, b) for a, b in edges):
+            self.use_landmarks = False
+            if self.goal is not None:
+                self.initialize(self.start, self.goal)
+            return
+        if self.goal is not None:
+            for a, _ in edges:
+                self.update_vertex(a)
+    
+    def base_distance(self, u, v):
+        """Distância da aresta u -> v no grafo base (inf se não existir)"""
+        return min((costs[2] for neighbor, costs in self.adjacency_list.get(u, [])
+                    if neighbor == v), default=inf)
+    
+    def replan(self):
+        """Repara o caminho atual após alterações de custos"""
         self.compute_shortest_path()
+        return self.extract_path()
+    
+    def extract_path(self):
+        """Segue o gradiente de g desde a origem até ao objetivo"""
+        if self.g_values.get(self.start, inf) == inf:
+            return (None, None, None, None)
         
-        # Reconstruir o caminho
         path = []
-        current = start
+        current = self.start
         toll = fuel = distance = 0
+        visited = set()
         
-        while current != goal:
+        while current != self.goal:
             path.append(current)
+            visited.add(current)
             
             min_cost = inf
             next_node = None
             selected_costs = None
             
             for neighbor, costs in self.get_neighbors(current):
-                if neighbor not in self.g_values:  # Verificação de segurança
-                    continue
                 total_cost = costs[2] + self.g_values.get(neighbor, inf)
                 if total_cost < min_cost:
                     min_cost = total_cost
                     next_node = neighbor
                     selected_costs = costs
             
-            if next_node is None:
+            if next_node is None or next_node in visited:
                 return (None, None, None, None)
             
             toll += selected_costs[0]
@@ -126,11 +217,28 @@ class Graph:
             distance += selected_costs[2]
             current = next_node
         
-        path.append(goal)
+        path.append(self.goal)
         return (path, toll, fuel, distance)
     
-    def find_top_paths(self, start, goal, num_paths=5, max_attempts=30):
-        """Versão adaptada para encontrar os melhores caminhos com D*"""
+    def d_star(self, start, goal):
+        """Implementação do algoritmo D* Lite (incremental entre chamadas)"""
+        # Fechar estradas só separa componentes, por isso o índice do grafo base chega
+        if not connected(self.adjacency_list, start, goal):
+            return (None, None, None, None)
+        if goal != self.goal:
+            self.initialize(start, goal)
+        elif start != self.start:
+            self.move_start(start)
+        
+        self.compute_shortest_path()
+        return self.extract_path()
+    
+    @cached_routes("D*")
+    @collects_stats
+    def find_top_paths(self, start, goal, num_paths=5, max_attempts=30, with_stats=False):
+        """Versão adaptada para encontrar os melhores caminhos com D*
+        
+        Com with_stats=True devolve (caminhos, SearchStats)."""
         paths = []
         attempts = 0
         
@@ -146,30 +254,7 @@ class Graph:
                         heapq.heappop(paths)
         
         # Ordena por distância, portagem e combustível
-        paths_sorted = sorted(paths, key=lambda x: (x[3], x[1], x[2]))
-        return paths_sorted
-
-def load_graph_from_csv(filename):
-    """Carrega o grafo do CSV com tratamento robusto de erros"""
-    adjacency_list = defaultdict(list)
-    try:
-        with open(filename, newline='', encoding='utf-8') as csvfile:
-            reader = csv.reader(csvfile)
-            next(reader)
-            for row in reader:
-                if len(row) < 5:
-                    continue
-                origem, destino, custo, combustivel, distancia = row
-                try:
-                    custos = (float(custo), float(combustivel), float(distancia))
-                except ValueError:
-                    continue
-                adjacency_list[origem].append((destino, custos))
-                adjacency_list[destino].append((origem, custos))
-    except FileNotFoundError:
-        print(f"Erro: Arquivo '{filename}' não encontrado.")
-        return None
-    return adjacency_list
+        return sorted(paths, key=lambda x: (x[3], x[1], x[2]))
 
 
 #def main():
@@ -1,44 +1,108 @@
-import csv
+import json
+import os
 from math import inf
-from collections import defaultdict, deque
+from collections import deque
 import random
 import heapq
+from carregador import load_graph_from_csv  # reexportado (GUI, benchmarks, scripts)
+from cache_heuristica import HEURISTIC_CACHE
+from conectividade import connected
+from estatisticas import collects_stats, timed
+from landmarks import graph_fingerprint
+from grafo_compacto import CompactGraph
+from cache_rotas import cached_routes
+
+# Tentativas por omissão do modo de convergência em find_top_paths
+LEARNING_TRIALS = 100
 
 class Graph:
-    def __init__(self, adjacency_list):
+    def __init__(self, adjacency_list, landmarks=None, heuristic_cache=HEURISTIC_CACHE,
+                 learning_dir=None, route_cache=None, learning_trials=0, lookahead=1):
         self.adjacency_list = adjacency_list
+        self.landmarks = landmarks
+        self.heuristic_cache = heuristic_cache
+        self.route_cache = route_cache
+        self.learning_dir = learning_dir
+        self.learning_trials = learning_trials
+        self.lookahead = lookahead
         self.heuristic = {}
+        # Objetivo cuja heurística de aprendizagem está em self.heuristic (None se
+        # a tabela foi substituída ou alterada fora de lrta_trial)
+        self.heuristic_goal = None
+        self.learned = {}
+        self.fingerprint = None
+        self.stats = None
+        self.on_expand = None
+        self.on_relax = None
     
     def get_neighbors(self, node):
         return self.adjacency_list.get(node, [])
     
-    def initialize_heuristic(self, goal):
+    def compute_heuristic(self, goal):
         """Inicialização robusta da heurística usando BFS"""
-        self.heuristic = {node: inf for node in self.adjacency_list}
-        self.heuristic[goal] = 0
+        if isinstance(self.adjacency_list, CompactGraph) and goal in self.adjacency_list:
+            return self.adjacency_list.propagate_distances(goal)
+        heuristic = {node: inf for node in self.adjacency_list}
+        heuristic[goal] = 0
         
         queue = deque([goal])
         while queue:
             current = queue.popleft()
             for neighbor, costs in self.get_neighbors(current):
-                if self.heuristic[neighbor] > self.heuristic[current] + costs[2]:
-                    self.heuristic[neighbor] = self.heuristic[current] + costs[2]
+                if heuristic[neighbor] > heuristic[current] + costs[2]:
+                    heuristic[neighbor] = heuristic[current] + costs[2]
                     queue.append(neighbor)
+        return heuristic
+    
+    @timed("heuristic_time")
+    def initialize_heuristic(self, goal):
+        """Heurística do objetivo (landmarks ALT, cache global ou cálculo direto)"""
+        self.heuristic_goal = None
+        if self.landmarks is not None:
+            # ALT: limites derivados dos landmarks em O(#landmarks) por nó
+            self.heuristic = self.landmarks.heuristic_for(goal)
+            return
+        
+        if self.heuristic_cache is None:
+            self.heuristic = self.compute_heuristic(goal)
+        else:
+            table = self.heuristic_cache.get_or_compute(
+                self.adjacency_list, goal, self.compute_heuristic)
+            # O LRTA* altera a heurística: trabalha sobre uma cópia da tabela
+            self.heuristic = dict(table)
     
-    def lrta_star(self, start, goal, exploration=0.2):
-        """Implementação correta do LRTA* com fator de exploração"""
+    @timed("search_time")
+    def lrta_star(self, start, goal, exploration=0.2, max_steps=None):
+        """Implementação correta do LRTA* com fator de exploração
+        
+        Não revisita nós, por isso o caminho nunca excede o número de cidades;
+        max_steps permite impor um limite mais curto."""
+        if not connected(self.adjacency_list, start, goal):
+            return (None, None, None, None)
+        # As atualizações com exploração podem sobrestimar: a tabela deixa de
+        # servir de base à aprendizagem (prepare_learning volta a construí-la)
+        self.heuristic_goal = None
         current = start
         path = [current]
         toll = fuel = distance = 0
         visited = set()
+        stats, on_expand, on_relax = self.stats, self.on_expand, self.on_relax
         
         while current != goal:
             visited.add(current)
             neighbors = []
+            if stats is not None:
+                stats.expanded += 1
+            if on_expand is not None:
+                on_expand(current)
             
             for neighbor, costs in self.get_neighbors(current):
                 if neighbor not in visited or neighbor == goal:
                     total_cost = costs[2] + self.heuristic.get(neighbor, 0)
+                    if stats is not None:
+                        stats.relaxations += 1
+                    if on_relax is not None:
+                        on_relax(current, neighbor, total_cost)
                     neighbors.append((
                         total_cost,
                         random.uniform(0, exploration),  # Fator de exploração
@@ -61,19 +125,166 @@ class Graph:
             distance += costs[2]
             current = next_node
             
-            if len(path) > 50:  # Prevenção contra loops
+            if max_steps is not None and len(path) > max_steps:
                 break
         
         return (path, toll, fuel, distance) if current == goal else (None, None, None, None)
     
-    def find_top_paths(self, start, goal, num_paths=5, max_attempts=30):
-        """Versão otimizada para encontrar os melhores caminhos"""
+    # Modo de aprendizagem multi-tentativa (LRTA* clássico com lookahead)
+    
+    def _learning_file(self, goal):
+        safe = "".join(c if c.isalnum() else "_" for c in str(goal))
+        return os.path.join(self.learning_dir, f"{safe}.lrta.json")
+    
+    def load_learned(self, goal):
+        """Lê os valores aprendidos para o objetivo (se existirem e forem deste grafo)"""
+        if self.learning_dir is None:
+            return {}
+        if self.fingerprint is None:
+            self.fingerprint = graph_fingerprint(self.adjacency_list)
+        try:
+            with open(self._learning_file(goal), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("goal") != goal or data.get("fingerprint") != self.fingerprint:
+            return {}
+        return data["values"]
+    
+    def save_learned(self, goal):
+        """Grava os valores aprendidos para o objetivo"""
+        if self.learning_dir is None:
+            return
+        if self.fingerprint is None:
+            self.fingerprint = graph_fingerprint(self.adjacency_list)
+        os.makedirs(self.learning_dir, exist_ok=True)
+        filename = self._learning_file(goal)
+        tmp_filename = f"{filename}.{os.getpid()}.tmp"
+        with open(tmp_filename, "w", encoding="utf-8") as f:
+            json.dump({"goal": goal, "fingerprint": self.fingerprint,
+                       "values": self.learned.get(goal, {})}, f)
+        os.replace(tmp_filename, filename)
+    
+    def prepare_learning(self, goal):
+        """Heurística inicial do objetivo com os valores já aprendidos por cima"""
+        if self.heuristic_goal == goal:
+            return
+        self.initialize_heuristic(goal)
+        learned = self.learned.setdefault(goal, {})
+        if not learned:
+            learned.update(self.load_learned(goal))
+        for node, value in learned.items():
+            if value > self.heuristic.get(node, 0):
+                self.heuristic[node] = value
+        self.heuristic_goal = goal
+    
+    def _lookahead(self, node, goal, depth):
+        """Melhor (custo até à fronteira + h) numa árvore de profundidade depth.
+        
+        Devolve (f, vizinho, custos) do primeiro passo do melhor ramo."""
+        best = (inf, None, None)
+        stats, on_relax = self.stats, self.on_relax
+        for neighbor, costs in self.get_neighbors(node):
+            if stats is not None:
+                stats.relaxations += 1
+            if neighbor == goal or depth <= 1:
+                f = costs[2] + self.heuristic.get(neighbor, 0)
+            else:
+                f = costs[2] + self._lookahead(neighbor, goal, depth - 1)[0]
+            if on_relax is not None:
+                on_relax(node, neighbor, f)
+            if f < best[0]:
+                best = (f, neighbor, costs)
+        return best
+    
+    @timed("search_time")
+    def lrta_trial(self, start, goal, lookahead=1, max_steps=None):
+        """Uma tentativa de LRTA* sem ruído, que pode revisitar nós.
+        
+        Devolve ((caminho, portagem, combustível, distância), houve_alteração)."""
+        if not connected(self.adjacency_list, start, goal):
+            return (None, None, None, None), False
+        self.prepare_learning(goal)
+        learned = self.learned[goal]
+        if max_steps is None:
+            max_steps = 10 * max(len(self.adjacency_list), 1)
+        
+        current = start
+        path = [current]
+        toll = fuel = distance = 0
+        changed = False
+        
+        while current != goal and len(path) <= max_steps:
+            if self.stats is not None:
+                self.stats.expanded += 1
+            if self.on_expand is not None:
+                self.on_expand(current)
+            
+            f, next_node, costs = self._lookahead(current, goal, lookahead)
+            if next_node is None:
+                break
+            
+            # Atualização LRTA*: a heurística só aumenta (mantém-se admissível)
+            if f > self.heuristic.get(current, 0) + 1e-9:
+                self.heuristic[current] = f
+                learned[current] = max(f, learned.get(current, 0))
+                changed = True
+            
+            path.append(next_node)
+            toll += costs[0]
+            fuel += costs[1]
+            distance += costs[2]
+            current = next_node
+        
+        if current != goal:
+            return (None, None, None, None), changed
+        return (path, toll, fuel, distance), changed
+    
+    def learn(self, start, goal, max_trials=100, lookahead=1, max_steps=None):
+        """Repete tentativas até convergir (uma tentativa sem alterações à heurística).
+        
+        Os valores aprendidos ficam em memória entre chamadas e, com learning_dir,
+        são gravados por objetivo para sobreviverem a reinícios do processo.
+        Devolve (melhor caminho, nº de tentativas, convergiu)."""
+        best = (None, None, None, None)
+        trials = 0
+        converged = False
+        while trials < max_trials:
+            trials += 1
+            result, changed = self.lrta_trial(start, goal, lookahead, max_steps)
+            if result[0] is not None and (best[0] is None or result[3] < best[3]):
+                best = result
+            if not changed:
+                converged = result[0] is not None
+                break
+        self.save_learned(goal)
+        return best, trials, converged
+    
+    @cached_routes("LRTA*")
+    @collects_stats
+    def find_top_paths(self, start, goal, num_paths=5, max_attempts=30, with_stats=False):
+        """Versão otimizada para encontrar os melhores caminhos
+        
+        Com learning_dir ou learning_trials, o primeiro caminho vem do modo de
+        convergência (learn, com self.lookahead) e as tentativas com exploração
+        partem da heurística aprendida. Com with_stats=True devolve
+        (caminhos, SearchStats)."""
         paths = []
         attempts = 0
+        if not connected(self.adjacency_list, start, goal):
+            return paths
         
+        if self.learning_dir is not None or self.learning_trials:
+            (path, toll, fuel, dist), _, _ = self.learn(
+                start, goal, self.learning_trials or LEARNING_TRIALS, self.lookahead)
+            if path:
+                heapq.heappush(paths, (dist, path, toll, fuel))
+        else:
+            # A heurística é inicializada uma vez: o que cada tentativa aprende
+            # passa para as seguintes
+            self.initialize_heuristic(goal)
         while len(paths) < num_paths and attempts < max_attempts:
             attempts += 1
-            self.initialize_heuristic(goal)
             path, toll, fuel, dist = self.lrta_star(start, goal)
             
             if path:
@@ -89,28 +300,6 @@ class Graph:
         paths_sorted = sorted(paths, key=lambda x: (x[0], x[2], x[3]))
         return [(p[1], p[2], p[3], p[0]) for p in paths_sorted]
 
-def load_graph_from_csv(filename):
-    """Carrega o grafo do CSV com tratamento robusto de erros"""
-    adjacency_list = defaultdict(list)
-    try:
-        with open(filename, newline='', encoding='utf-8') as csvfile:
-            reader = csv.reader(csvfile)
-            next(reader)  # Pula cabeçalho
-            for row in reader:
-                if len(row) < 5:
-                    continue
-                origem, destino, custo, combustivel, distancia = row
-                try:
-                    custos = (float(custo), float(combustivel), float(distancia))
-                except ValueError:
-                    continue
-                adjacency_list[origem].append((destino, custos))
-                adjacency_list[destino].append((origem, custos))
-    except FileNotFoundError:
-        print(f"Erro: Arquivo '{filename}' não encontrado.")
-        return None
-    return adjacency_list
-
 # def main():
 #     filename = "cities_nodes_special.csv"
 #     graph_data = load_graph_from_csv(filename)
@@ -0,0 +1,229 @@
+"""Execução em lote de consultas de rotas, com resultados em JSONL.
+
+Cada linha de entrada é um objeto JSON {"origin", "destination", "algorithm", "k"}
+ou uma linha CSV "origem,destino[,algoritmo[,k]]". Exemplo:
+
+    python batch_rotas.py consultas.jsonl --graph cities_nodes_special.csv > resultados.jsonl
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from CODIGOparacsv import Graph as AStar_Graph
+from DinamicAStar import Graph as DStar_Graph
+from LRTA import Graph as LRTA_Graph
+from cache_rotas import RouteCache
+from carregador import DEDUP_POLICIES
+from contraction_hierarchies import ContractionHierarchy, Graph as CH_Graph
+from grafo_compacto import load_graph_cached
+
+PLANNERS = {"A*": AStar_Graph, "LRTA*": LRTA_Graph, "D*": DStar_Graph, "CH": CH_Graph}
+
+# Estado de cada processo trabalhador (carregado uma vez no initializer)
+_graph = None
+_hierarchy = None
+_hierarchy_file = None
+_route_cache = None
+
+
+def parse_query(line, default_algorithm="A*", default_k=5):
+    """Converte uma linha de entrada numa consulta (dicionário)"""
+    line = line.strip()
+    if line.startswith("{"):
+        data = json.loads(line)
+        origin, destination = data["origin"], data["destination"]
+        algorithm = data.get("algorithm", default_algorithm)
+        k = data.get("k", default_k)
+    else:
+        fields = [field.strip() for field in line.split(",")]
+        origin, destination = fields[0], fields[1]
+        algorithm = fields[2] if len(fields) > 2 and fields[2] else default_algorithm
+        k = fields[3] if len(fields) > 3 and fields[3] else default_k
+    for name, value in (("origin", origin), ("destination", destination), ("algorithm", algorithm)):
+        if not isinstance(value, str):
+            raise ValueError(f"{name} tem de ser texto, não {type(value).__name__}")
+    if isinstance(k, bool) or not isinstance(k, (int, float, str)):
+        raise ValueError(f"k tem de ser um inteiro, não {type(k).__name__}")
+    k = int(k)
+    if k < 1:
+        raise ValueError("k tem de ser positivo")
+    return {"origin": origin, "destination": destination, "algorithm": algorithm, "k": k}
+
+
+def read_queries(stream, default_algorithm="A*", default_k=5):
+    """Gera (índice, consulta) a partir de um ficheiro de entrada, linha a linha"""
+    index = 0
+    for line in stream:
+        if not line.strip() or line.startswith("#"):
+            continue
+        try:
+            query = parse_query(line, default_algorithm, default_k)
+        except (ValueError, KeyError, IndexError) as e:
+            query = {"error": f"Linha inválida: {e}", "line": line.rstrip("\n")}
+        yield index, query
+        index += 1
+
+
+def init_worker(csv_filename, dedup, route_cache_path=None, cache_ttl=None):
+    """Abre o snapshot do grafo uma vez por processo (páginas partilhadas via mmap)
+
+    Cada processo tem a sua cache de rotas em memória; com route_cache_path
+    todos partilham também a mesma base sqlite.
+    """
+    global _graph, _hierarchy_file, _route_cache
+    _graph = load_graph_cached(csv_filename, dedup=dedup)
+    _hierarchy_file = csv_filename + ".ch.json"
+    _route_cache = RouteCache(ttl=cache_ttl, path=route_cache_path)
+
+
+def _planner(algorithm):
+    global _hierarchy
+    if algorithm not in PLANNERS:
+        raise ValueError(f"Algoritmo desconhecido: {algorithm}")
+    if algorithm == "CH":
+        if _hierarchy is None:
+            _hierarchy = ContractionHierarchy.load_or_build(_graph, _hierarchy_file)
+        return CH_Graph(_graph, _hierarchy, route_cache=_route_cache)
+    return PLANNERS[algorithm](_graph, route_cache=_route_cache)
+
+
+def run_query(index, query, with_stats=False):
+    """Executa uma consulta e devolve o registo JSON com o tempo gasto"""
+    record = {"index": index, **query}
+    if "error" in query:
+        return record
+
+    started = time.perf_counter()
+    try:
+        if query["origin"] not in _graph or query["destination"] not in _graph:
+            raise KeyError("Uma ou ambas as cidades não existem no grafo.")
+        planner = _planner(query["algorithm"])
+        if with_stats:
+            paths, stats = planner.find_top_paths(
+                query["origin"], query["destination"], query["k"], with_stats=True)
+            record["stats"] = stats.as_dict()
+        else:
+            paths = planner.find_top_paths(query["origin"], query["destination"], query["k"])
+        record["paths"] = [{"path": path, "toll": toll, "fuel": fuel, "distance": dist}
+                           for path, toll, fuel, dist in paths]
+    except (KeyError, ValueError) as e:
+        record["error"] = str(e.args[0]) if e.args else repr(e)
+    except Exception as e:  # uma consulta nunca deve abortar o lote inteiro
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["elapsed_ms"] = (time.perf_counter() - started) * 1000
+    return record
+
+
+def run_chunk(chunk, with_stats=False):
+    return [run_query(index, query, with_stats) for index, query in chunk]
+
+
+def _chunks(queries, size):
+    chunk = []
+    for item in queries:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_batch(queries, csv_filename, out, workers=None, chunksize=64,
+              order="input", dedup="pareto", with_stats=False,
+              route_cache_path=None, cache_ttl=None):
+    """Distribui as consultas por um ProcessPoolExecutor e escreve JSONL em out.
+
+    Mantém no máximo 4 blocos por trabalhador em voo, por isso a entrada pode
+    ser um stream arbitrariamente longo. order="input" preserva a ordem de
+    entrada; order="completion" escreve cada resultado assim que termina.
+    with_stats=True junta a cada registo os contadores da pesquisa (SearchStats).
+    route_cache_path guarda os resultados numa base sqlite partilhada (cache_rotas).
+    """
+    workers = workers or os.cpu_count() or 1
+    # Compila o snapshot no processo principal antes de arrancar os trabalhadores
+    if load_graph_cached(csv_filename, dedup=dedup) is None:
+        return 0
+
+    chunk_iter = _chunks(queries, chunksize)
+    pending = {}   # futuro -> bloco de consultas
+    buffered = {}
+    next_index = 0
+    written = 0
+
+    def emit(record):
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    with ProcessPoolExecutor(workers, initializer=init_worker,
+                             initargs=(csv_filename, dedup, route_cache_path, cache_ttl)) as executor:
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < workers * 4:
+                chunk = next(chunk_iter, None)
+                if chunk is None:
+                    exhausted = True
+                    break
+                pending[executor.submit(run_chunk, chunk, with_stats)] = chunk
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk = pending.pop(future)
+                try:
+                    records = future.result()
+                except Exception as e:  # ex.: trabalhador morto; o resto do lote continua
+                    records = [{"index": index, **query, "error": f"{type(e).__name__}: {e}"}
+                               for index, query in chunk]
+                for record in records:
+                    if order == "completion":
+                        emit(record)
+                        written += 1
+                    else:
+                        buffered[record["index"]] = record
+            while next_index in buffered:
+                emit(buffered.pop(next_index))
+                next_index += 1
+                written += 1
+            out.flush()
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Planeamento de rotas em lote (JSONL)")
+    parser.add_argument("input", nargs="?", default="-",
+                        help="ficheiro de consultas (JSONL ou CSV); '-' para stdin")
+    parser.add_argument("--graph", default="cities_nodes_special.csv", help="CSV do grafo")
+    parser.add_argument("--algorithm", default="A*", choices=sorted(PLANNERS),
+                        help="algoritmo por omissão")
+    parser.add_argument("-k", type=int, default=5, help="número de caminhos por omissão")
+    parser.add_argument("--workers", type=int, default=None, help="processos (omissão: nº de CPUs)")
+    parser.add_argument("--chunksize", type=int, default=64, help="consultas por tarefa")
+    parser.add_argument("--order", choices=("input", "completion"), default="input")
+    parser.add_argument("--stats", action="store_true",
+                        help="inclui as estatísticas de cada pesquisa")
+    parser.add_argument("--dedup", default="pareto", choices=("none", *DEDUP_POLICIES),
+                        help="política de deduplicação de arestas ('none' para desligar; "
+                             "'pareto' mantém as variantes de custos não dominadas)")
+    parser.add_argument("--route-cache", default=None,
+                        help="base sqlite para reaproveitar resultados entre execuções")
+    parser.add_argument("--cache-ttl", type=float, default=None,
+                        help="validade (s) dos resultados na cache de rotas")
+    args = parser.parse_args(argv)
+
+    dedup = None if args.dedup == "none" else args.dedup
+    stream = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    try:
+        queries = read_queries(stream, args.algorithm, args.k)
+        run_batch(queries, args.graph, sys.stdout, args.workers, args.chunksize,
+                  args.order, dedup, args.stats, args.route_cache, args.cache_ttl)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2 @@
+"""Benchmarks dos planeadores em grafos sintéticos (ver benchmarks.executar) e
+verificação por força bruta dos planeadores exatos (benchmarks.verificacao)."""
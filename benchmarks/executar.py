@@ -0,0 +1,193 @@
+"""Compara CODIGOparacsv (A*), DinamicAStar (D* Lite) e LRTA em grafos sintéticos.
+
+    python -m benchmarks.executar --generators grid road_like --sizes 1000 10000 \\
+        --queries 20 --output resultados.json [--compare anterior.json]
+
+Cada (gerador, tamanho, planeador) corre num processo filho, para que o pico
+de RSS medido seja só desse planeador. O resultado é um JSON com o commit
+atual, comparável entre commits com --compare.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from CODIGOparacsv import Graph as AStar_Graph, load_graph_from_csv
+from DinamicAStar import Graph as DStar_Graph
+from LRTA import Graph as LRTA_Graph
+from estatisticas import SearchStats
+from landmarks import dijkstra
+
+from benchmarks.geradores import GENERATORS, generate
+
+PLANNERS = ("A*", "D*", "LRTA*")
+
+
+def solve(planner, adjacency_list, start, goal):
+    """Uma consulta de caminho único; devolve (resultado, SearchStats)"""
+    if planner == "A*":
+        graph = AStar_Graph(adjacency_list, heuristic_cache=None)
+        graph.stats = SearchStats()
+        graph.initialize_heuristic(goal)
+        result = graph.a_star(start, goal)
+    elif planner == "D*":
+        graph = DStar_Graph(adjacency_list, heuristic_cache=None)
+        graph.stats = SearchStats()
+        result = graph.d_star(start, goal)
+    elif planner == "LRTA*":
+        graph = LRTA_Graph(adjacency_list, heuristic_cache=None)
+        graph.stats = SearchStats()
+        graph.initialize_heuristic(goal)
+        result = graph.lrta_star(start, goal)
+    else:
+        raise ValueError(f"Planeador desconhecido: {planner}")
+    return result, graph.stats
+
+
+def _run_planner(planner, csv_filename, queries, references, pipe):
+    adjacency_list = load_graph_from_csv(csv_filename)
+    wall = 0.0
+    totals = SearchStats()
+    gaps = []
+    failures = 0
+    for (start, goal), reference in zip(queries, references):
+        started = time.perf_counter()
+        (path, _, _, dist), stats = solve(planner, adjacency_list, start, goal)
+        wall += time.perf_counter() - started
+        totals.merge(stats)
+        if path is None:
+            failures += 1
+        elif reference:
+            gaps.append((dist - reference) / reference)
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak_kb //= 1024
+    pipe.send({
+        "planner": planner,
+        "queries": len(queries),
+        "wall_time_s": wall,
+        "mean_query_ms": wall / len(queries) * 1000 if queries else 0.0,
+        "mean_expansions": totals.expanded / len(queries) if queries else 0.0,
+        "stats": totals.as_dict(),
+        "peak_rss_kb": peak_kb,
+        "mean_optimality_gap": sum(gaps) / len(gaps) if gaps else None,
+        "max_optimality_gap": max(gaps) if gaps else None,
+        "failures": failures,
+    })
+    pipe.close()
+
+
+def run_isolated(planner, csv_filename, queries, references):
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(
+        target=_run_planner, args=(planner, csv_filename, queries, references, sender))
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        result = {"planner": planner, "error": f"processo terminou com código {process.exitcode}"}
+    process.join()
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(generators, sizes, planners=PLANNERS, num_queries=20, seed=0, workdir=None):
+    """Gera cada grafo, escolhe consultas aleatórias e mede todos os planeadores"""
+    results = []
+    workdir = workdir or tempfile.mkdtemp(prefix="bench_grafos_")
+    os.makedirs(workdir, exist_ok=True)
+    for kind in generators:
+        for size in sizes:
+            csv_filename = os.path.join(workdir, f"{kind}_{size}_{seed}.csv")
+            if not os.path.exists(csv_filename):
+                generate(kind, size, csv_filename, seed)
+
+            adjacency_list = load_graph_from_csv(csv_filename)
+            nodes = list(adjacency_list)
+            rng = random.Random(seed)
+            queries = [tuple(rng.sample(nodes, 2)) for _ in range(num_queries)]
+            references = [dijkstra(adjacency_list, start).get(goal) for start, goal in queries]
+            edges = sum(len(v) for v in adjacency_list.values())
+            del adjacency_list
+
+            for planner in planners:
+                record = run_isolated(planner, csv_filename, queries, references)
+                record.update({"generator": kind, "size": size, "nodes": len(nodes), "edges": edges})
+                results.append(record)
+                print(f"{kind:>16} {size:>8} {planner:>6} "
+                      f"{record.get('mean_query_ms', float('nan')):10.2f} ms "
+                      f"{record.get('mean_expansions', float('nan')):12.1f} exp", file=sys.stderr)
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "seed": seed,
+        "results": results,
+    }
+
+
+def compare(current, previous, threshold=0.10):
+    """Lista as regressões de tempo médio acima do limiar face a outra execução"""
+    before = {(r["generator"], r["size"], r["planner"]): r for r in previous["results"]}
+    regressions = []
+    for record in current["results"]:
+        old = before.get((record["generator"], record["size"], record["planner"]))
+        if not old or "mean_query_ms" not in old or "mean_query_ms" not in record:
+            continue
+        if old["mean_query_ms"] and record["mean_query_ms"] > old["mean_query_ms"] * (1 + threshold):
+            regressions.append({
+                "generator": record["generator"], "size": record["size"],
+                "planner": record["planner"], "before_ms": old["mean_query_ms"],
+                "after_ms": record["mean_query_ms"],
+            })
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark dos planeadores de rotas")
+    parser.add_argument("--generators", nargs="+", default=["grid", "road_like"],
+                        choices=sorted(GENERATORS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000])
+    parser.add_argument("--planners", nargs="+", default=list(PLANNERS), choices=PLANNERS)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", default=None, help="pasta para os CSV gerados")
+    parser.add_argument("--output", default="-", help="ficheiro JSON de resultados ('-' = stdout)")
+    parser.add_argument("--compare", default=None, help="JSON de uma execução anterior")
+    parser.add_argument("--threshold", type=float, default=0.10, help="limiar de regressão")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.generators, args.sizes, args.planners, args.queries,
+                       args.seed, args.workdir)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            report["regressions"] = compare(report, json.load(f), args.threshold)
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if report.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Geradores de grafos sintéticos com sementes, escritos no esquema CSV do projeto.
+
+    python -m benchmarks.geradores grid 10000 grid_10k.csv --seed 1
+"""
+import argparse
+import csv
+import math
+import random
+
+HEADER = ["origin_city", "destination_city", "toll", "fuel", "distance_km"]
+
+
+def _costs(rng, distance):
+    """Portagem e combustível plausíveis para um troço com a distância dada"""
+    toll = round(distance * rng.uniform(0.03, 0.08), 2) if rng.random() < 0.3 else 0.0
+    fuel = round(distance * rng.uniform(0.06, 0.09), 2)
+    return toll, fuel, round(distance, 1)
+
+
+def grid(n, seed=0):
+    """Grelha 4-vizinhos com cerca de n nós"""
+    rng = random.Random(seed)
+    side = max(2, math.isqrt(n))
+    for i in range(side):
+        for j in range(side):
+            if j + 1 < side:
+                yield (f"G{i}_{j}", f"G{i}_{j + 1}", *_costs(rng, rng.uniform(5, 15)))
+            if i + 1 < side:
+                yield (f"G{i}_{j}", f"G{i + 1}_{j}", *_costs(rng, rng.uniform(5, 15)))
+
+
+def _binned_points(rng, n):
+    points = [(rng.random(), rng.random()) for _ in range(n)]
+    cell = 1 / max(1, math.isqrt(n))
+    bins = {}
+    for index, (x, y) in enumerate(points):
+        bins.setdefault((int(x / cell), int(y / cell)), []).append(index)
+    return points, cell, bins
+
+
+def random_geometric(n, seed=0, radius=None):
+    """Grafo geométrico aleatório no quadrado unitário (escala de 1000 km)"""
+    rng = random.Random(seed)
+    if radius is None:
+        radius = math.sqrt(math.log(max(n, 2)) / (math.pi * n))
+    points, cell, bins = _binned_points(rng, n)
+    reach = int(math.ceil(radius / cell))
+    for (cx, cy), members in bins.items():
+        for dx in range(-reach, reach + 1):
+            for dy in range(-reach, reach + 1):
+                for j in bins.get((cx + dx, cy + dy), ()):
+                    for i in members:
+                        if i < j:
+                            d = math.dist(points[i], points[j])
+                            if d <= radius:
+                                yield (f"R{i}", f"R{j}", *_costs(rng, d * 1000))
+
+
+def road_like(n, seed=0):
+    """Rede planar tipo estrada: grelha com jitter, troços em falta e uma diagonal por célula"""
+    rng = random.Random(seed)
+    side = max(2, math.isqrt(n))
+    pos = {(i, j): (i + rng.uniform(-0.3, 0.3), j + rng.uniform(-0.3, 0.3))
+           for i in range(side) for j in range(side)}
+
+    def edge(a, b):
+        detour = rng.uniform(1.0, 1.3)
+        return (f"S{a[0]}_{a[1]}", f"S{b[0]}_{b[1]}",
+                *_costs(rng, math.dist(pos[a], pos[b]) * 10 * detour))
+
+    for i in range(side):
+        for j in range(side):
+            if j + 1 < side and rng.random() < 0.85:
+                yield edge((i, j), (i, j + 1))
+            if i + 1 < side and rng.random() < 0.85:
+                yield edge((i, j), (i + 1, j))
+            if i + 1 < side and j + 1 < side and rng.random() < 0.15:
+                yield edge((i, j), (i + 1, j + 1))
+
+
+def scale_free(n, seed=0, m=2):
+    """Grafo livre de escala (Barabási–Albert, m ligações por nó novo)"""
+    rng = random.Random(seed)
+    targets = list(range(m))
+    repeated = []
+    for node in range(m, n):
+        for target in set(targets):
+            yield (f"B{node}", f"B{target}", *_costs(rng, rng.uniform(10, 200)))
+        repeated.extend(targets)
+        repeated.extend([node] * m)
+        targets = [rng.choice(repeated) for _ in range(m)]
+
+
+GENERATORS = {
+    "grid": grid,
+    "random_geometric": random_geometric,
+    "road_like": road_like,
+    "scale_free": scale_free,
+}
+
+
+def write_csv(filename, edges):
+    """Escreve as arestas no esquema de cities_nodes_special.csv; devolve o nº de linhas"""
+    count = 0
+    with open(filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for row in edges:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def generate(kind, n, filename, seed=0):
+    if kind not in GENERATORS:
+        raise ValueError(f"Gerador desconhecido: {kind}")
+    return write_csv(filename, GENERATORS[kind](n, seed))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera grafos sintéticos em CSV")
+    parser.add_argument("kind", choices=sorted(GENERATORS))
+    parser.add_argument("nodes", type=int)
+    parser.add_argument("output")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    rows = generate(args.kind, args.nodes, args.output, args.seed)
+    print(f"{rows} arestas escritas em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""Verificação por força bruta dos planeadores exatos em grafos pequenos aleatórios.
+
+    python -m benchmarks.verificacao --graphs 30 --nodes 9 --seed 0
+
+Em cada grafo enumera todos os caminhos simples entre pares de cidades e compara:
+Yen (find_top_paths), orçamentos de portagem/combustível (constrained_paths),
+frente de Pareto (NAMOA*), Contraction Hierarchies, A* bidirecional (com e
+sem landmarks) e replaneamento do D* Lite com landmarks após subidas, descidas
+e fechos de estradas contra essa enumeração e contra o Dijkstra. Com NumPy
+compara também o backend Floyd–Warshall de route_matrix com o Dijkstra.
+Termina com código 1 se houver alguma divergência, por isso serve de guarda
+de regressão.
+"""
+import argparse
+import math
+import random
+import sys
+
+from CODIGOparacsv import Graph as AStar_Graph
+from DinamicAStar import Graph as DStar_Graph
+from contraction_hierarchies import ContractionHierarchy
+from landmarks import LandmarkIndex, dijkstra
+from matriz_rotas import OBJECTIVES, np, recover_path, route_matrix
+from multiobjetivo import dominates
+
+CHECKS = ("yen", "constrained", "pareto", "ch", "bidirectional", "dstar", "floyd")
+
+
+def random_graph(n, extra_edges, rng):
+    """Grafo conexo não orientado (árvore aleatória + arestas extra) com custos
+    independentes, para que a frente de Pareto não seja trivial"""
+    names = [f"C{i}" for i in range(n)]
+    pairs = {(rng.randrange(i), i) for i in range(1, n)}
+    while len(pairs) < min(n - 1 + extra_edges, n * (n - 1) // 2):
+        a, b = sorted(rng.sample(range(n), 2))
+        pairs.add((a, b))
+    adjacency_list = {name: [] for name in names}
+    for a, b in sorted(pairs):
+        costs = (float(rng.choice((0, 0, rng.randint(1, 9)))),
+                 float(rng.randint(1, 9)), float(rng.randint(1, 20)))
+        adjacency_list[names[a]].append((names[b], costs))
+        adjacency_list[names[b]].append((names[a], costs))
+    return adjacency_list
+
+
+def simple_paths(adjacency_list, start, goal):
+    """Todos os caminhos simples [(caminho, portagem, combustível, distância)]"""
+    found = []
+    path = [start]
+    on_path = {start}
+
+    def extend(node, toll, fuel, dist):
+        if node == goal:
+            found.append((list(path), toll, fuel, dist))
+            return
+        for neighbor, costs in adjacency_list[node]:
+            if neighbor not in on_path:
+                path.append(neighbor)
+                on_path.add(neighbor)
+                extend(neighbor, toll + costs[0], fuel + costs[1], dist + costs[2])
+                on_path.discard(neighbor)
+                path.pop()
+
+    extend(start, 0.0, 0.0, 0.0)
+    return found
+
+
+def path_costs(adjacency_list, path):
+    """Custos de um caminho pelas arestas do grafo (None se alguma não existir)"""
+    totals = [0.0, 0.0, 0.0]
+    for u, v in zip(path, path[1:]):
+        costs = [c for neighbor, c in adjacency_list[u] if neighbor == v]
+        if not costs:
+            return None
+        for i in range(3):
+            totals[i] += costs[0][i]
+    return tuple(totals)
+
+
+def _close(a, b):
+    return all(math.isclose(x, y, rel_tol=1e-9, abs_tol=1e-6) for x, y in zip(a, b))
+
+
+def _valid(adjacency_list, route, start, goal):
+    """O caminho liga start a goal, é simples e os custos conferem com as arestas"""
+    path = route[0]
+    costs = path_costs(adjacency_list, path) if path else None
+    return (costs is not None and path[0] == start and path[-1] == goal
+            and len(set(path)) == len(path) and _close(costs, route[1:4]))
+
+
+def check_yen(adjacency_list, start, goal, paths, k=4):
+    expected = sorted(p[3] for p in paths)[:k]
+    got = AStar_Graph(adjacency_list, heuristic_cache=None).find_top_paths(start, goal, k)
+    if not all(_valid(adjacency_list, r, start, goal) for r in got):
+        return "caminho inválido"
+    if len({tuple(r[0]) for r in got}) != len(got):
+        return "caminhos repetidos"
+    if not _close([r[3] for r in got], expected) or len(got) != len(expected):
+        return f"distâncias {[r[3] for r in got]} != {expected}"
+    return None
+
+
+def check_constrained(adjacency_list, start, goal, paths, rng):
+    max_toll = rng.choice((0.0, rng.randint(0, 15), math.inf))
+    max_fuel = rng.choice((rng.randint(5, 30), math.inf))
+    feasible = [p for p in paths if p[1] <= max_toll + 1e-9 and p[2] <= max_fuel + 1e-9]
+    got = AStar_Graph(adjacency_list, heuristic_cache=None).constrained_paths(
+        start, goal, max_toll, max_fuel, k=3)
+    if not feasible:
+        return None if not got else f"inviável mas devolveu {len(got)} rotas"
+    if not got:
+        return f"sem rota, esperado {min(p[3] for p in feasible)} (orçamento {max_toll}, {max_fuel})"
+    for r in got:
+        if not _valid(adjacency_list, r, start, goal):
+            return "caminho inválido"
+        if r[1] > max_toll + 1e-9 or r[2] > max_fuel + 1e-9:
+            return f"rota fora do orçamento {r[1:3]} (orçamento {max_toll}, {max_fuel})"
+    if not math.isclose(got[0][3], min(p[3] for p in feasible), abs_tol=1e-6):
+        return f"distância {got[0][3]} != {min(p[3] for p in feasible)}"
+    for a in got:
+        for b in got:
+            if a is not b and dominates(a[1:4], b[1:4]):
+                return "rotas dominadas na resposta"
+    return None
+
+
+def check_pareto(adjacency_list, start, goal, paths):
+    vectors = {p[1:4] for p in paths}
+    expected = {v for v in vectors
+                if not any(w != v and dominates(w, v) for w in vectors)}
+    got = AStar_Graph(adjacency_list, heuristic_cache=None).pareto_paths(
+        start, goal, max_front=len(paths) + 1)
+    if not all(_valid(adjacency_list, r, start, goal) for r in got):
+        return "caminho inválido"
+    got_vectors = {tuple(r[1:4]) for r in got}
+    if got_vectors != expected:
+        return f"frente {sorted(got_vectors)} != {sorted(expected)}"
+    return None
+
+
+def _check_shortest(adjacency_list, start, goal, result, reference):
+    if result[0] is None:
+        return f"sem caminho, esperado {reference}"
+    if not _valid(adjacency_list, result, start, goal):
+        return "caminho inválido"
+    if not math.isclose(result[3], reference, abs_tol=1e-6):
+        return f"distância {result[3]} != {reference}"
+    return None
+
+
+def check_ch(adjacency_list, hierarchy, start, goal, reference):
+    return _check_shortest(adjacency_list, start, goal, hierarchy.query(start, goal), reference)
+
+
+def check_bidirectional(adjacency_list, landmarks, start, goal, reference):
+    for index in (None, landmarks):
+        graph = AStar_Graph(adjacency_list, landmarks=index, heuristic_cache=None)
+        error = _check_shortest(adjacency_list, start, goal,
+                                graph.bidirectional_a_star(start, goal), reference)
+        if error:
+            return f"{'com' if index else 'sem'} landmarks: {error}"
+    return None
+
+
+def check_dstar(adjacency_list, landmarks, start, goal, rng, changes=4):
+    """Replaneamentos do D* Lite após alterações de custos, contra o Dijkstra
+    no grafo já alterado"""
+    planner = DStar_Graph(adjacency_list, landmarks=landmarks)
+    current = {node: list(neighbors) for node, neighbors in adjacency_list.items()}
+    roads = [(u, v, costs) for u, neighbors in adjacency_list.items()
+             for v, costs in neighbors if u < v]
+    for step in range(changes + 1):
+        if step:
+            u, v, costs = rng.choice(roads)
+            if rng.random() < 0.2:
+                new = None
+            else:
+                new = (costs[0], costs[1], round(costs[2] * rng.choice((0.3, 0.7, 1.5, 3.0)), 1))
+            planner.update_edge_cost(u, v, new)
+            for a, b in ((u, v), (v, u)):
+                current[a] = [(n, c) for n, c in current[a] if n != b]
+                if new is not None:
+                    current[a].append((b, new))
+        result = planner.d_star(start, goal)
+        reference = dijkstra(current, start).get(goal)
+        if reference is None:
+            if result[0] is not None:
+                return f"alteração {step}: caminho {result[0]} num grafo sem ligação"
+            continue
+        error = _check_shortest(current, start, goal, result, reference)
+        if error:
+            return f"alteração {step}: {error}"
+    return None
+
+
+def check_floyd(adjacency_list):
+    """Matriz de todos os pares: Floyd–Warshall contra Dijkstra em cada objetivo.
+
+    Em empates os dois backends podem escolher caminhos diferentes, por isso só
+    o objetivo tem de coincidir; os três totais têm de ser os do caminho
+    reconstruído pelos predecessores."""
+    nodes = list(adjacency_list)
+    for objective, column in OBJECTIVES.items():
+        results = {backend: route_matrix(adjacency_list, nodes, nodes, objective, backend,
+                                         return_predecessors=True)
+                   for backend in ("floyd", "dijkstra")}
+        for i, origin in enumerate(nodes):
+            for j, destination in enumerate(nodes):
+                expected = float(results["dijkstra"][objective][i][j])
+                for backend, result in results.items():
+                    got = [float(result[name][i][j]) for name in ("toll", "fuel", "distance")]
+                    pair = f"{backend} {objective} {origin} -> {destination}"
+                    if not math.isclose(got[column], expected, abs_tol=1e-6) and got[column] != expected:
+                        return f"{pair}: {got[column]} != {expected}"
+                    if math.isinf(expected):
+                        continue
+                    path = recover_path(result, origin, destination)
+                    costs = path_costs(adjacency_list, path) if path else None
+                    if costs is None or not _close(costs, got):
+                        return f"{pair}: caminho {path} não confere com {got}"
+    return None
+
+
+def run(num_graphs=30, nodes=9, extra_edges=8, pairs=6, seed=0, checks=CHECKS):
+    """Corre as verificações; devolve (nº de comparações, lista de divergências)"""
+    rng = random.Random(seed)
+    compared = 0
+    failures = []
+    for g in range(num_graphs):
+        adjacency_list = random_graph(nodes, extra_edges, rng)
+        names = list(adjacency_list)
+        hierarchy = ContractionHierarchy.build(adjacency_list) if "ch" in checks else None
+        landmarks = LandmarkIndex.build(adjacency_list, num_landmarks=3, seed=g)
+        if "floyd" in checks and np is not None:
+            # Todos os pares de uma vez; sem NumPy o backend não existe e fica de fora
+            error = check_floyd(adjacency_list)
+            compared += 1
+            if error:
+                failures.append({"graph": g, "start": "*", "goal": "*",
+                                 "check": "floyd", "error": error})
+        for _ in range(pairs):
+            start, goal = rng.sample(names, 2)
+            paths = simple_paths(adjacency_list, start, goal)
+            reference = dijkstra(adjacency_list, start)[goal]
+            results = {}
+            if "yen" in checks:
+                results["yen"] = check_yen(adjacency_list, start, goal, paths)
+            if "constrained" in checks:
+                results["constrained"] = check_constrained(adjacency_list, start, goal, paths, rng)
+            if "pareto" in checks:
+                results["pareto"] = check_pareto(adjacency_list, start, goal, paths)
+            if "ch" in checks:
+                results["ch"] = check_ch(adjacency_list, hierarchy, start, goal, reference)
+            if "bidirectional" in checks:
+                results["bidirectional"] = check_bidirectional(
+                    adjacency_list, landmarks, start, goal, reference)
+            if "dstar" in checks:
+                results["dstar"] = check_dstar(adjacency_list, landmarks, start, goal, rng)
+            for check, error in results.items():
+                compared += 1
+                if error:
+                    failures.append({"graph": g, "start": start, "goal": goal,
+                                     "check": check, "error": error})
+    return compared, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verificação por força bruta dos planeadores")
+    parser.add_argument("--graphs", type=int, default=30)
+    parser.add_argument("--nodes", type=int, default=9)
+    parser.add_argument("--extra-edges", type=int, default=8)
+    parser.add_argument("--pairs", type=int, default=6, help="consultas por grafo")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--checks", nargs="+", default=list(CHECKS), choices=CHECKS)
+    args = parser.parse_args(argv)
+
+    compared, failures = run(args.graphs, args.nodes, args.extra_edges, args.pairs,
+                             args.seed, args.checks)
+    for failure in failures:
+        print(f"[{failure['check']}] grafo {failure['graph']} "
+              f"{failure['start']} -> {failure['goal']}: {failure['error']}")
+    print(f"{compared} comparações, {len(failures)} divergências")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
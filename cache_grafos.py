@@ -0,0 +1,49 @@
+import weakref
+
+
+class PerGraphCache:
+    """Valores associados a grafos pela identidade, para as caches partilhadas.
+
+    Um grafo que aceite referências fracas (CompactGraph) não fica preso: a
+    entrada desaparece quando ele (e o seu mmap) é libertado. Um dicionário
+    não as aceita e fica referenciado, para que o id() não seja reutilizado
+    por outro objeto; no máximo max_graphs grafos são guardados (sai o mais
+    antigo).
+    """
+
+    def __init__(self, max_graphs=8):
+        self.max_graphs = max_graphs
+        self.entries = {}   # id(grafo) -> (referência, valor)
+
+    def get(self, graph, default=None):
+        entry = self.entries.get(id(graph))
+        if entry is None or entry[0]() is not graph:
+            return default
+        return entry[1]
+
+    def set(self, graph, value):
+        key = id(graph)
+        try:
+            ref = weakref.ref(graph, lambda ref, key=key: self._release(key, ref))
+        except TypeError:
+            ref = lambda: graph
+        self.entries.pop(key, None)
+        self.entries[key] = (ref, value)
+        while len(self.entries) > self.max_graphs:
+            self.entries.pop(next(iter(self.entries)), None)
+
+    def pop(self, graph):
+        entry = self.entries.get(id(graph))
+        if entry is not None and entry[0]() is graph:
+            self.entries.pop(id(graph), None)
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _release(self, key, ref):
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] is ref:
+            self.entries.pop(key, None)
@@ -0,0 +1,108 @@
+import sys
+import threading
+from collections import OrderedDict
+from itertools import count
+
+from cache_grafos import PerGraphCache
+
+
+class HeuristicCache:
+    """Cache global de tabelas heurísticas por objetivo (árvore reversa de caminhos mínimos).
+
+    As entradas são indexadas por (grafo, versão, objetivo) e despejadas por LRU
+    ou LFU quando a memória estimada ultrapassa max_bytes. Só grafos com um
+    contador `version` (CompactGraph) são guardados: um dicionário de
+    adjacências pode ser alterado no lugar sem que nada o note, e uma tabela
+    antiga sobrestimaria distâncias e levaria o A* a caminhos subótimos.
+    O grafo não fica preso à cache: quando é libertado, as suas tabelas
+    deixam de ser encontradas e saem no despejo seguinte.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, policy="lru"):
+        if policy not in ("lru", "lfu"):
+            raise ValueError(f"Política de despejo desconhecida: {policy}")
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.entries = OrderedDict()   # chave -> [tabela, bytes, frequência]
+        self.graphs = PerGraphCache(max_graphs=64)   # grafo -> ficha usada nas chaves
+        self.tokens = count()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # A GUI pesquisa numa thread de trabalho; o cálculo fica fora do lock
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _estimate_size(table):
+        return sys.getsizeof(table) + 32 * len(table)
+
+    def _token(self, adjacency_list):
+        # Uma ficha nunca é reutilizada, ao contrário do id() de um grafo libertado
+        token = self.graphs.get(adjacency_list)
+        if token is None:
+            token = next(self.tokens)
+            self.graphs.set(adjacency_list, token)
+        return token
+
+    def get_or_compute(self, adjacency_list, goal, compute):
+        """Devolve a tabela do objetivo, calculando-a com compute(goal) se faltar"""
+        if not hasattr(adjacency_list, "version"):
+            return compute(goal)
+        with self.lock:
+            key = (self._token(adjacency_list), adjacency_list.version, goal)
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                entry[2] += 1
+                self.entries.move_to_end(key)
+                return entry[0]
+            self.misses += 1
+
+        table = compute(goal)
+        size = self._estimate_size(table)
+        if size <= self.max_bytes:
+            with self.lock:
+                if key not in self.entries:
+                    self.entries[key] = [table, size, 1]
+                    self.current_bytes += size
+                    self._evict()
+        return table
+
+    def _evict(self):
+        while self.current_bytes > self.max_bytes and self.entries:
+            if self.policy == "lru":
+                key = next(iter(self.entries))
+            else:
+                key = min(self.entries, key=lambda k: self.entries[k][2])
+            self._drop(key)
+            self.evictions += 1
+
+    def _drop(self, key):
+        entry = self.entries.pop(key)
+        self.current_bytes -= entry[1]
+
+    def invalidate(self, adjacency_list=None):
+        """Descarta as tabelas de um grafo (ou todas) após alterações às arestas"""
+        with self.lock:
+            if adjacency_list is None:
+                self.entries.clear()
+                self.current_bytes = 0
+                return
+            token = self.graphs.get(adjacency_list)
+            for key in [k for k in self.entries if k[0] == token]:
+                self._drop(key)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "bytes": self.current_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+HEURISTIC_CACHE = HeuristicCache()
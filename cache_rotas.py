@@ -0,0 +1,193 @@
+import functools
+import inspect
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from cache_grafos import PerGraphCache
+from estatisticas import SearchStats
+from landmarks import graph_fingerprint
+
+
+class RouteCache:
+    """Cache de resultados de find_top_paths, à frente de todos os planeadores.
+
+    As entradas são indexadas por (algoritmo, origem, destino, k, objetivo,
+    versão do grafo), onde a versão junta a impressão digital do grafo (nós,
+    arestas e somas de portagem, combustível e distância) ao seu contador
+    `version`: quando os custos mudam as entradas antigas deixam de ser
+    encontradas, também as gravadas em disco por outro processo. Despejo por LRU com limite de entradas e
+    TTL opcional; com `path`, os resultados também ficam numa base sqlite e
+    sobrevivem a reinícios do processo.
+    """
+
+    def __init__(self, max_entries=1024, ttl=None, path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()   # chave -> (caminhos, instante de criação)
+        self.versions = PerGraphCache()   # grafo -> (version, impressão digital)
+                                          # (só grafos com contador `version`)
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.lock = threading.Lock()
+        self.db = None
+        if path is not None:
+            # Vários processos (batch_rotas) podem partilhar o mesmo ficheiro
+            self.db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS routes "
+                            "(key TEXT PRIMARY KEY, paths TEXT, created REAL)")
+            if ttl is not None:
+                self.db.execute("DELETE FROM routes WHERE created < ?", (time.time() - ttl,))
+            self.db.commit()
+
+    def graph_version(self, adjacency_list):
+        """Impressão digital e contador de versão do grafo.
+
+        Num grafo com contador `version` (CompactGraph) é calculada uma vez por
+        versão; um dicionário simples pode ser alterado no lugar sem aviso, por
+        isso a impressão digital é recalculada em cada consulta.
+        """
+        if not hasattr(adjacency_list, "version"):
+            return (*graph_fingerprint(adjacency_list), 0)
+        version = adjacency_list.version
+        with self.lock:
+            entry = self.versions.get(adjacency_list)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+        fingerprint = (*graph_fingerprint(adjacency_list), version)
+        with self.lock:
+            self.versions.set(adjacency_list, (version, fingerprint))
+        return fingerprint
+
+    def key(self, algorithm, start, goal, k, objective, adjacency_list):
+        return (algorithm, start, goal, k, objective, self.graph_version(adjacency_list))
+
+    def _expired(self, created):
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def get(self, key):
+        """Caminhos guardados para a chave, ou None"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if self._expired(entry[1]):
+                    del self.entries[key]
+                    self.expirations += 1
+                else:
+                    self.hits += 1
+                    self.entries.move_to_end(key)
+                    return _copy_paths(entry[0])
+
+            if self.db is not None:
+                row = self.db.execute("SELECT paths, created FROM routes WHERE key = ?",
+                                      (json.dumps(key),)).fetchone()
+                if row is not None and not self._expired(row[1]):
+                    paths = [(path, toll, fuel, dist) for path, toll, fuel, dist in json.loads(row[0])]
+                    self.hits += 1
+                    self.disk_hits += 1
+                    self._store(key, paths, row[1])
+                    return _copy_paths(paths)
+
+            self.misses += 1
+            return None
+
+    def put(self, key, paths):
+        paths = _copy_paths(paths)
+        created = time.time()
+        with self.lock:
+            self._store(key, paths, created)
+            if self.db is not None:
+                self.db.execute("INSERT OR REPLACE INTO routes VALUES (?, ?, ?)",
+                                (json.dumps(key), json.dumps(paths, ensure_ascii=False), created))
+                self.db.commit()
+
+    def _store(self, key, paths, created):
+        self.entries[key] = (paths, created)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, adjacency_list=None):
+        """Descarta os resultados de um grafo (ou todos), incluindo os gravados em disco"""
+        if adjacency_list is None:
+            with self.lock:
+                self.entries.clear()
+                if self.db is not None:
+                    self.db.execute("DELETE FROM routes")
+                    self.db.commit()
+            return
+        fingerprint = self.graph_version(adjacency_list)
+        with self.lock:
+            for key in [k for k in self.entries if k[5] == fingerprint]:
+                del self.entries[key]
+            if self.db is not None:
+                for (key,) in self.db.execute("SELECT key FROM routes").fetchall():
+                    if tuple(json.loads(key)[5]) == fingerprint:
+                        self.db.execute("DELETE FROM routes WHERE key = ?", (key,))
+                self.db.commit()
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+def _copy_paths(paths):
+    # Quem recebe os caminhos pode alterá-los sem estragar a cache
+    return [(list(path), toll, fuel, dist) for path, toll, fuel, dist in paths]
+
+
+def cached_routes(algorithm, objective="distance"):
+    """Decorador de find_top_paths: consulta self.route_cache (se existir) antes de pesquisar.
+
+    Planeadores com alterações locais às arestas (edge_overrides do D* Lite)
+    não usam a cache, porque essas alterações não fazem parte da versão do grafo.
+    Os argumentos são associados à assinatura do método, por isso podem vir por
+    posição ou por nome; orçamentos (max_toll/max_fuel) entram no objetivo da chave.
+    Num acerto com with_stats=True as estatísticas devolvidas vêm a zero.
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            cache = self.route_cache
+            if cache is None or getattr(self, "edge_overrides", None):
+                return method(self, *args, **kwargs)
+
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = bound.arguments
+            with_stats = arguments.get("with_stats", False)
+            budgets = tuple((name, arguments[name]) for name in ("max_toll", "max_fuel")
+                            if arguments.get(name) is not None)
+            key = cache.key(algorithm, arguments["start"], arguments["goal"],
+                            arguments["num_paths"],
+                            (objective, *budgets) if budgets else objective, self.adjacency_list)
+            paths = cache.get(key)
+            if paths is not None:
+                return (paths, SearchStats()) if with_stats else paths
+
+            result = method(self, *args, **kwargs)
+            cache.put(key, result[0] if with_stats else result)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,277 @@
+import csv
+import gzip
+from array import array
+from collections import defaultdict
+from itertools import islice
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional
+    np = None
+
+DEDUP_POLICIES = ("min_distance", "first", "pareto")
+
+
+def _dominates(a, b):
+    """a domina b se não é pior em nenhum custo e é melhor em pelo menos um"""
+    return all(x <= y for x, y in zip(a, b)) and a != b
+
+
+def dedup_adjacency(adjacency_list, policy="min_distance"):
+    """Junta arestas paralelas/inversas duplicadas de cada lista de adjacências.
+
+    Políticas:
+      - "min_distance": mantém só a aresta de menor distância para cada vizinho
+      - "first": mantém a primeira aresta lida para cada vizinho
+      - "pareto": mantém os tuplos de custos não dominados (portagem, combustível, distância)
+
+    Devolve (nova_lista_de_adjacências, relatório) onde o relatório conta as
+    arestas lidas, mantidas e colapsadas.
+    """
+    if policy not in DEDUP_POLICIES:
+        raise ValueError(f"Política de deduplicação desconhecida: {policy}")
+
+    deduped = defaultdict(list)
+    report = {"policy": policy, "edges_in": 0, "edges_out": 0, "collapsed": 0, "pairs_merged": 0}
+
+    for node, neighbors in adjacency_list.items():
+        kept = {}
+        duplicated = set()
+        for neighbor, costs in neighbors:
+            report["edges_in"] += 1
+            current = kept.get(neighbor)
+            if current is None:
+                kept[neighbor] = [costs]
+                continue
+            duplicated.add(neighbor)
+            if policy == "min_distance":
+                if costs[2] < current[0][2]:
+                    current[0] = costs
+            elif policy == "pareto":
+                if not any(c == costs or _dominates(c, costs) for c in current):
+                    current[:] = [c for c in current if not _dominates(costs, c)] + [costs]
+
+        for neighbor, cost_list in kept.items():
+            for costs in cost_list:
+                deduped[node].append((neighbor, costs))
+        report["pairs_merged"] += len(duplicated)
+        if node not in deduped:
+            deduped[node] = []
+
+    report["edges_out"] = sum(len(v) for v in deduped.values())
+    report["collapsed"] = report["edges_in"] - report["edges_out"]
+    return deduped, report
+
+
+def load_graph_from_csv(filename, dedup=None, report=None):
+    """Carrega o grafo do CSV com tratamento robusto de erros
+    
+    dedup escolhe a política de dedup_adjacency para juntar arestas duplicadas
+    (None mantém todas). report, se dado, recebe as mesmas contagens que
+    load_compact_streaming (rows, edges, short_rows, bad_numbers) e, com
+    dedup, o resumo da deduplicação."""
+    adjacency_list = defaultdict(list)
+    counters = {"rows": 0, "short_rows": 0, "bad_numbers": 0}
+    try:
+        for chunk in iter_csv_chunks(filename):
+            counters["rows"] += len(chunk)
+            origins, destinations, tolls, fuels, dists = parse_chunk(chunk, counters)
+            for origem, destino, custos in zip(origins, destinations, zip(tolls, fuels, dists)):
+                adjacency_list[origem].append((destino, custos))
+                adjacency_list[destino].append((origem, custos))
+    except FileNotFoundError:
+        print(f"Erro: Arquivo '{filename}' não encontrado.")
+        return None
+    counters["edges"] = sum(len(neighbors) for neighbors in adjacency_list.values())
+    if report is not None:
+        report.update(counters)
+    if dedup:
+        adjacency_list, summary = dedup_adjacency(adjacency_list, dedup)
+        if report is not None:
+            report.update(summary)
+    return adjacency_list
+
+
+# Carregamento em streaming (redes com milhões de arestas)
+#
+# O CSV (opcionalmente .gz) é lido em blocos de chunk_rows linhas; cada bloco é
+# convertido por colunas (NumPy se existir) e escrito diretamente em arrays de
+# arestas, sem criar tuplos por linha. Na leitura a memória fica no bloco atual,
+# no índice de nomes e nas colunas de arestas; no fim, from_edges ordena essas
+# colunas para o CSR numa cópia, por isso o pico é cerca do dobro do grafo final.
+
+CHUNK_ROWS = 65536
+
+
+def open_text(filename):
+    """Abre um CSV de texto, descomprimindo se for gzip (pela extensão ou pelos bytes mágicos)"""
+    with open(filename, "rb") as f:
+        gzipped = f.read(2) == b"\x1f\x8b"
+    if gzipped or filename.endswith(".gz"):
+        return gzip.open(filename, "rt", newline="", encoding="utf-8")
+    return open(filename, newline="", encoding="utf-8")
+
+
+def iter_csv_chunks(filename, chunk_rows=CHUNK_ROWS):
+    """Gera blocos de até chunk_rows linhas do CSV (sem o cabeçalho)"""
+    with open_text(filename) as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        while True:
+            chunk = list(islice(reader, chunk_rows))
+            if not chunk:
+                return
+            yield chunk
+
+
+def _parse_floats(values):
+    """Converte uma coluna de texto para float64 de uma só vez; ValueError se houver lixo"""
+    if np is not None:
+        return array('d', np.asarray(values, dtype=np.float64).tobytes())
+    return array('d', map(float, values))
+
+
+def parse_chunk(rows, counters):
+    """Separa um bloco de linhas em colunas (origens, destinos, portagem, combustível, distância).
+
+    Linhas curtas ou com valores não numéricos são descartadas e contadas em
+    counters["short_rows"] / counters["bad_numbers"].
+    """
+    if any(len(row) < 5 for row in rows):
+        valid = [row for row in rows if len(row) >= 5]
+        counters["short_rows"] += len(rows) - len(valid)
+        rows = valid
+    if not rows:
+        return [], [], array('d'), array('d'), array('d')
+
+    origins, destinations, tolls, fuels, dists = zip(*(row[:5] for row in rows))
+    try:
+        return (origins, destinations, _parse_floats(tolls), _parse_floats(fuels),
+                _parse_floats(dists))
+    except ValueError:
+        pass
+
+    # Há pelo menos uma linha inválida: só este bloco é convertido linha a linha
+    good = []
+    for row in rows:
+        try:
+            good.append((row[0], row[1], float(row[2]), float(row[3]), float(row[4])))
+        except ValueError:
+            counters["bad_numbers"] += 1
+    if not good:
+        return [], [], array('d'), array('d'), array('d')
+    origins, destinations, tolls, fuels, dists = zip(*good)
+    return origins, destinations, array('d', tolls), array('d', fuels), array('d', dists)
+
+
+def dedup_compact(graph, policy="min_distance"):
+    """Mesmas políticas de dedup_adjacency, aplicadas às colunas CSR de um CompactGraph.
+
+    Percorre um nó de cada vez, por isso só o dicionário de vizinhos desse nó
+    ocupa memória extra. Devolve (novo CompactGraph, relatório).
+    """
+    from grafo_compacto import CompactGraph
+
+    if policy not in DEDUP_POLICIES:
+        raise ValueError(f"Política de deduplicação desconhecida: {policy}")
+
+    targets, tolls, fuels, dists = graph.targets, graph.toll, graph.fuel, graph.dist
+    offsets = array('q', [0])
+    out_targets = array('i')
+    out_toll, out_fuel, out_dist = array('d'), array('d'), array('d')
+    report = {"policy": policy, "edges_in": graph.num_edges, "edges_out": 0,
+              "collapsed": 0, "pairs_merged": 0}
+
+    for i in range(len(graph.names)):
+        kept = {}
+        duplicated = set()
+        for e in graph.edge_range(i):
+            neighbor = targets[e]
+            costs = (tolls[e], fuels[e], dists[e])
+            current = kept.get(neighbor)
+            if current is None:
+                kept[neighbor] = [costs]
+                continue
+            duplicated.add(neighbor)
+            if policy == "min_distance":
+                if costs[2] < current[0][2]:
+                    current[0] = costs
+            elif policy == "pareto":
+                if not any(c == costs or _dominates(c, costs) for c in current):
+                    current[:] = [c for c in current if not _dominates(costs, c)] + [costs]
+
+        for neighbor, cost_list in kept.items():
+            for toll, fuel, dist in cost_list:
+                out_targets.append(neighbor)
+                out_toll.append(toll)
+                out_fuel.append(fuel)
+                out_dist.append(dist)
+        offsets.append(len(out_targets))
+        report["pairs_merged"] += len(duplicated)
+
+    report["edges_out"] = len(out_targets)
+    report["collapsed"] = report["edges_in"] - report["edges_out"]
+    return CompactGraph(graph.names, offsets, out_targets, out_toll, out_fuel, out_dist), report
+
+
+def load_compact_streaming(filename, dedup=None, report=None, chunk_rows=CHUNK_ROWS,
+                           progress=None):
+    """Carrega o CSV (ou CSV.gz) diretamente para um CompactGraph, bloco a bloco.
+
+    Cada linha dá duas arestas (ida e volta), como em load_graph_from_csv.
+    progress(linhas_lidas, arestas, linhas_descartadas), se dado, é chamado
+    após cada bloco. report recebe as contagens de linhas (rows, edges,
+    short_rows, bad_numbers) e, com dedup, o resumo da deduplicação.
+    """
+    from grafo_compacto import CompactGraph
+
+    names = []
+    index = {}
+    sources, targets = array('i'), array('i')
+    toll, fuel, dist = array('d'), array('d'), array('d')
+    counters = {"rows": 0, "short_rows": 0, "bad_numbers": 0}
+
+    def ids(cities):
+        out = array('i', bytes(4 * len(cities)))
+        for k, city in enumerate(cities):
+            i = index.get(city)
+            if i is None:
+                i = index[city] = len(names)
+                names.append(city)
+            out[k] = i
+        return out
+
+    try:
+        for chunk in iter_csv_chunks(filename, chunk_rows):
+            counters["rows"] += len(chunk)
+            origins, destinations, tolls, fuels, dists = parse_chunk(chunk, counters)
+            # Ida e volta intercaladas (o0, d0, o1, d1, ...): a mesma ordem de nós e
+            # de arestas que load_graph_from_csv produz
+            pairs = [None] * (2 * len(origins))
+            pairs[0::2], pairs[1::2] = origins, destinations
+            chunk_sources = ids(pairs)
+            chunk_targets = array('i', chunk_sources)
+            chunk_targets[0::2], chunk_targets[1::2] = chunk_sources[1::2], chunk_sources[0::2]
+            sources.extend(chunk_sources)
+            targets.extend(chunk_targets)
+            for column, values in ((toll, tolls), (fuel, fuels), (dist, dists)):
+                doubled = array('d', bytes(16 * len(values)))
+                doubled[0::2] = doubled[1::2] = values
+                column.extend(doubled)
+            if progress is not None:
+                progress(counters["rows"], len(sources),
+                         counters["short_rows"] + counters["bad_numbers"])
+    except FileNotFoundError:
+        print(f"Erro: Arquivo '{filename}' não encontrado.")
+        return None
+
+    graph = CompactGraph.from_edges(names, sources, targets, toll, fuel, dist)
+    del sources, targets, toll, fuel, dist
+    counters["edges"] = graph.num_edges
+    if report is not None:
+        report.update(counters)
+    if dedup:
+        graph, summary = dedup_compact(graph, dedup)
+        if report is not None:
+            report.update(summary)
+    return graph
@@ -0,0 +1,149 @@
+from collections import deque
+
+from cache_grafos import PerGraphCache
+
+MAX_INDEXES = 4
+
+_indexes = PerGraphCache(MAX_INDEXES)   # grafo -> (version, índice)
+
+
+class ConnectivityIndex:
+    """Componentes conexas do grafo (union-find com compressão de caminhos).
+
+    Os planeadores consultam connected(origem, destino) antes de pesquisar: se
+    as cidades estão em componentes diferentes (ilhas, ligações só por ferry)
+    a consulta é rejeitada logo, em vez de se esgotar a componente da origem.
+    As arestas são tratadas como não dirigidas, por isso "ligados" é uma
+    condição necessária para haver caminho (e suficiente com o CSV simétrico).
+    """
+
+    def __init__(self):
+        self.parent = {}
+        self.size = {}
+        self.count = 0
+
+    @classmethod
+    def build(cls, adjacency_list):
+        index = cls()
+        for node, neighbors in adjacency_list.items():
+            index.add_node(node)
+            for neighbor, _ in neighbors:
+                index._union(node, neighbor)
+        return index
+
+    def add_node(self, node):
+        if node not in self.parent:
+            self.parent[node] = node
+            self.size[node] = 1
+            self.count += 1
+
+    def find(self, node):
+        parent = self.parent
+        root = node
+        while parent[root] != root:
+            root = parent[root]
+        while parent[node] != root:
+            parent[node], node = root, parent[node]
+        return root
+
+    def _union(self, u, v):
+        self.add_node(u)
+        self.add_node(v)
+        a, b = self.find(u), self.find(v)
+        if a == b:
+            return
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        self.count -= 1
+
+    def connected(self, u, v):
+        if u == v:
+            return True
+        if u not in self.parent or v not in self.parent:
+            return False
+        return self.find(u) == self.find(v)
+
+    def component(self, node):
+        """Identificador da componente do nó (None se não existir)"""
+        return self.find(node) if node in self.parent else None
+
+    def members(self, node):
+        """Nós da mesma componente (para a GUI filtrar destinos inalcançáveis)"""
+        root = self.component(node)
+        if root is None:
+            return []
+        return [other for other in self.parent if self.find(other) == root]
+
+
+def connectivity_for(adjacency_list):
+    """Índice de conectividade do grafo, construído uma vez e partilhado.
+
+    É reconstruído se o grafo mudar de versão ou de número de nós. Um dicionário
+    simples não tem versão: para decidir se há caminho use connected(), que
+    confirma as respostas negativas.
+    """
+    index = cached_connectivity(adjacency_list)
+    if index is None:
+        index = ConnectivityIndex.build(adjacency_list)
+        _indexes.set(adjacency_list, (getattr(adjacency_list, "version", 0), index))
+    return index
+
+
+def cached_connectivity(adjacency_list):
+    """Índice já construído para o grafo (ou None), sem o construir"""
+    entry = _indexes.get(adjacency_list)
+    if (entry is not None and entry[0] == getattr(adjacency_list, "version", 0)
+            and len(entry[1].parent) >= len(adjacency_list)):
+        return entry[1]
+    return None
+
+
+def _still_separated(adjacency_list, index, u, v):
+    """Confirma num dicionário que u e v continuam em componentes diferentes.
+
+    Pesquisa em largura alternada a partir de u e de v, cada uma dentro da sua
+    componente no índice, e pára quando uma se esgota: o custo é o da
+    componente mais pequena. Uma aresta que saia da componente só pode ter
+    sido acrescentada depois do índice, e aí a resposta é None (reconstruir).
+    Como o índice, trata as estradas como tendo os dois sentidos.
+    """
+    sides = [(index.component(node), deque([node]), {node}) for node in (u, v)]
+    while True:
+        for root, queue, seen in sides:
+            if not queue:
+                return True
+            for neighbor, _ in adjacency_list.get(queue.popleft(), []):
+                if neighbor not in seen:
+                    if index.component(neighbor) != root:
+                        return None
+                    seen.add(neighbor)
+                    queue.append(neighbor)
+
+
+def connected(adjacency_list, u, v, build=True):
+    """Pode haver caminho de u para v? (teste rápido dos planeadores)
+
+    Um "sim" desatualizado não faz mal: a pesquisa corre e não encontra nada.
+    Um "não" rejeita a consulta, por isso só se confia nele diretamente em
+    grafos com contador `version`; num dicionário, que pode ter ganho estradas
+    no lugar, é confirmado por _still_separated e o índice só é reconstruído
+    se o grafo tiver mesmo mudado. Com build=False o índice nunca é construído
+    (sem índice pronto a resposta é True).
+    """
+    index = connectivity_for(adjacency_list) if build else cached_connectivity(adjacency_list)
+    if index is None or index.connected(u, v):
+        return True
+    if hasattr(adjacency_list, "version"):
+        return False
+    if index.component(u) is not None and index.component(v) is not None:
+        if _still_separated(adjacency_list, index, u, v):
+            return False
+    elif u not in adjacency_list or v not in adjacency_list:
+        # Cidade sem estradas (ou inexistente): não há caminho
+        return False
+    if not build:
+        return True
+    _indexes.pop(adjacency_list)
+    return connectivity_for(adjacency_list).connected(u, v)
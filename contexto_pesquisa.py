@@ -0,0 +1,95 @@
+import threading
+from math import inf
+
+from cache_grafos import PerGraphCache
+from grafo_compacto import CompactGraph
+
+MAX_CONTEXTS = 4
+
+
+class SearchContext:
+    """Estado de pesquisa reutilizável, em listas indexadas pelo id do nó.
+
+    Cada entrada tem um carimbo de época: reset() só incrementa a época, por
+    isso uma pesquisa paga apenas pelos nós em que toca e não O(V) de setup.
+    """
+
+    def __init__(self, names, ids):
+        size = len(names)
+        self.names = names
+        self.ids = ids
+        self.epoch = 0
+        self.stamp = [0] * size     # época em que g/parent/custos foram escritos
+        self.closed = [0] * size    # época em que o nó foi fechado
+        self.g = [inf] * size
+        self.parent = [-1] * size
+        self.toll = [0.0] * size
+        self.fuel = [0.0] * size
+        self.dist = [0.0] * size
+
+    @classmethod
+    def from_adjacency(cls, adjacency_list):
+        if isinstance(adjacency_list, CompactGraph):
+            return cls(adjacency_list.names, adjacency_list.index)
+        names = list(adjacency_list)
+        ids = {name: i for i, name in enumerate(names)}
+        for neighbors in list(adjacency_list.values()):
+            for neighbor, _ in neighbors:
+                if neighbor not in ids:
+                    ids[neighbor] = len(names)
+                    names.append(neighbor)
+        return cls(names, ids)
+
+    def reset(self):
+        """Esvazia o contexto em O(1)"""
+        self.epoch += 1
+
+    def g_of(self, i):
+        return self.g[i] if self.stamp[i] == self.epoch else inf
+
+    def is_closed(self, i):
+        return self.closed[i] == self.epoch
+
+    def close(self, i):
+        self.closed[i] = self.epoch
+
+    def reopen(self, i):
+        self.closed[i] = 0
+
+    def record(self, i, g, parent, toll, fuel, dist):
+        self.stamp[i] = self.epoch
+        self.g[i] = g
+        self.parent[i] = parent
+        self.toll[i] = toll
+        self.fuel[i] = fuel
+        self.dist[i] = dist
+
+    def path_to(self, i):
+        path = []
+        while i != -1:
+            path.append(self.names[i])
+            i = self.parent[i]
+        path.reverse()
+        return path
+
+
+_contexts = PerGraphCache(MAX_CONTEXTS)   # grafo -> {thread: SearchContext}
+
+
+def context_for(adjacency_list):
+    """Contexto partilhado pelas pesquisas sobre o mesmo grafo (um por thread)"""
+    contexts = _contexts.get(adjacency_list)
+    if contexts is None:
+        contexts = {}
+        _contexts.set(adjacency_list, contexts)
+    thread = threading.get_ident()
+    context = contexts.get(thread)
+    if context is not None and len(context.ids) >= len(adjacency_list):
+        return context
+    # A GUI usa uma thread por pesquisa: só os contextos mais recentes ficam
+    contexts.pop(thread, None)
+    while len(contexts) >= MAX_CONTEXTS:
+        contexts.pop(next(iter(contexts)), None)
+    context = SearchContext.from_adjacency(adjacency_list)
+    contexts[thread] = context
+    return context
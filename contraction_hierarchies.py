@@ -0,0 +1,261 @@
+import heapq
+import json
+import os
+from math import inf
+
+from landmarks import graph_fingerprint
+from estatisticas import collects_stats, timed
+from conectividade import connected
+from cache_rotas import cached_routes
+
+WITNESS_SETTLE_LIMIT = 200
+
+
+def _add_costs(a, b):
+    return (a[0] + b[0], a[1] + b[1], a[2] + b[2])
+
+
+class ContractionHierarchy:
+    """Contraction Hierarchies sobre a distância, com portagem/combustível nos atalhos.
+
+    edges[(a, b)] = ((portagem, combustível, distância), meio) para cada aresta
+    da hierarquia; meio é None numa aresta original ou o nó contraído que o
+    atalho substitui (usado para desempacotar o caminho real).
+    """
+
+    def __init__(self, rank, edges):
+        self.rank = rank
+        self.edges = edges
+        self.up_out = {node: [] for node in rank}   # a -> b com rank[b] > rank[a]
+        self.up_in = {node: [] for node in rank}    # a -> b com rank[a] > rank[b], guardada em b
+        for (a, b), (costs, _) in edges.items():
+            if rank[a] < rank[b]:
+                self.up_out[a].append((b, costs))
+            else:
+                self.up_in[b].append((a, costs))
+
+    @classmethod
+    def build(cls, adjacency_list):
+        """Ordena os nós por diferença de arestas (com atualização preguiçosa) e contrai-os"""
+        out = {node: {} for node in adjacency_list}
+        inc = {node: {} for node in adjacency_list}
+        for node, neighbors in adjacency_list.items():
+            for neighbor, costs in neighbors:
+                out.setdefault(neighbor, {})
+                inc.setdefault(neighbor, {})
+                if node != neighbor and costs[2] < out[node].get(neighbor, ((inf, inf, inf), None))[0][2]:
+                    out[node][neighbor] = (tuple(costs), None)
+                    inc[neighbor][node] = (tuple(costs), None)
+
+        contracted_neighbors = {node: 0 for node in out}
+
+        def shortcuts_for(v):
+            shortcuts = []
+            for u, (cost_uv, _) in inc[v].items():
+                targets = {w: _add_costs(cost_uv, cost_vw)
+                           for w, (cost_vw, _) in out[v].items() if w != u}
+                if not targets:
+                    continue
+                limit = max(c[2] for c in targets.values())
+                witness = cls._witness_search(out, u, v, limit, targets)
+                for w, costs in targets.items():
+                    if witness.get(w, inf) > costs[2]:
+                        shortcuts.append((u, w, costs))
+            return shortcuts
+
+        def priority(v):
+            edge_difference = len(shortcuts_for(v)) - len(inc[v]) - len(out[v])
+            return edge_difference + contracted_neighbors[v]
+
+        heap = [(priority(v), v) for v in out]
+        heapq.heapify(heap)
+        rank = {}
+        edges = {}
+
+        while heap:
+            _, v = heapq.heappop(heap)
+            if v in rank:
+                continue
+            # Atualização preguiçosa: recalcula e volta a inserir se já não for o mínimo
+            current = priority(v)
+            if heap and current > heap[0][0]:
+                heapq.heappush(heap, (current, v))
+                continue
+
+            shortcuts = shortcuts_for(v)
+            rank[v] = len(rank)
+            for w, data in out[v].items():
+                edges[(v, w)] = data
+            for u, data in inc[v].items():
+                edges[(u, v)] = data
+
+            for u in inc[v]:
+                del out[u][v]
+                contracted_neighbors[u] += 1
+            for w in out[v]:
+                del inc[w][v]
+                contracted_neighbors[w] += 1
+            for u, w, costs in shortcuts:
+                if costs[2] < out[u].get(w, ((inf, inf, inf), None))[0][2]:
+                    out[u][w] = (costs, v)
+                    inc[w][u] = (costs, v)
+            del out[v], inc[v]
+
+        return cls(rank, edges)
+
+    @staticmethod
+    def _witness_search(out, source, excluded, limit, targets):
+        """Dijkstra limitado de source sem passar por excluded (procura caminhos testemunha)"""
+        distances = {source: 0}
+        heap = [(0, source)]
+        remaining = set(targets)
+        settled = 0
+        while heap and remaining and settled < WITNESS_SETTLE_LIMIT:
+            d, node = heapq.heappop(heap)
+            if d > distances[node]:
+                continue
+            if d > limit:
+                break
+            settled += 1
+            remaining.discard(node)
+            for neighbor, (costs, _) in out[node].items():
+                if neighbor == excluded:
+                    continue
+                nd = d + costs[2]
+                if nd < distances.get(neighbor, inf):
+                    distances[neighbor] = nd
+                    heapq.heappush(heap, (nd, neighbor))
+        return distances
+
+    def _unpack(self, a, b):
+        costs, middle = self.edges[(a, b)]
+        if middle is None:
+            return [a, b]
+        return self._unpack(a, middle)[:-1] + self._unpack(middle, b)
+
+    def query(self, start, goal, stats=None, on_expand=None):
+        """Pesquisa bidirecional ascendente; devolve (caminho, portagem, combustível, distância)"""
+        if start not in self.rank or goal not in self.rank:
+            return (None, None, None, None)
+        if start == goal:
+            return ([start], 0, 0, 0)
+
+        dist = ({start: 0}, {goal: 0})
+        parent = ({start: None}, {goal: None})
+        heaps = ([(0, start)], [(0, goal)])
+        graphs = (self.up_out, self.up_in)
+        best, meeting = inf, None
+
+        while heaps[0] or heaps[1]:
+            for side in (0, 1):
+                heap = heaps[side]
+                if not heap:
+                    continue
+                d, node = heapq.heappop(heap)
+                if stats is not None:
+                    stats.heap_pops += 1
+                if d > dist[side][node]:
+                    if stats is not None:
+                        stats.stale_pops += 1
+                    continue
+                if d >= best:
+                    heap.clear()
+                    continue
+                if stats is not None:
+                    stats.expanded += 1
+                if on_expand is not None:
+                    on_expand(node)
+                other = dist[1 - side].get(node)
+                if other is not None and d + other < best:
+                    best, meeting = d + other, node
+                for neighbor, costs in graphs[side][node]:
+                    nd = d + costs[2]
+                    if stats is not None:
+                        stats.relaxations += 1
+                    if nd < dist[side].get(neighbor, inf):
+                        dist[side][neighbor] = nd
+                        parent[side][neighbor] = node
+                        heapq.heappush(heap, (nd, neighbor))
+                        if stats is not None:
+                            stats.heap_pushes += 1
+                            stats.observe_open(len(heaps[0]) + len(heaps[1]))
+
+        if meeting is None:
+            return (None, None, None, None)
+
+        forward = [meeting]
+        while parent[0][forward[-1]] is not None:
+            forward.append(parent[0][forward[-1]])
+        forward.reverse()
+        backward = [meeting]
+        while parent[1][backward[-1]] is not None:
+            backward.append(parent[1][backward[-1]])
+        hierarchy_path = forward + backward[1:]
+
+        path = [start]
+        toll = fuel = distance = 0
+        for a, b in zip(hierarchy_path, hierarchy_path[1:]):
+            costs = self.edges[(a, b)][0]
+            toll += costs[0]
+            fuel += costs[1]
+            distance += costs[2]
+            path.extend(self._unpack(a, b)[1:])
+        return (path, toll, fuel, distance)
+
+    def save(self, filename, fingerprint=None):
+        # Escrita atómica: vários processos podem construir a mesma hierarquia
+        tmp_filename = f"{filename}.{os.getpid()}.tmp"
+        with open(tmp_filename, "w", encoding="utf-8") as f:
+            json.dump({
+                "fingerprint": fingerprint,
+                "rank": self.rank,
+                "edges": [[a, b, *costs, middle] for (a, b), (costs, middle) in self.edges.items()],
+            }, f)
+        os.replace(tmp_filename, filename)
+
+    @classmethod
+    def load(cls, filename, fingerprint=None):
+        """Lê a hierarquia gravada; devolve None se pertencer a outro grafo"""
+        try:
+            with open(filename, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if fingerprint is not None and data.get("fingerprint") != fingerprint:
+            return None
+        edges = {(a, b): ((toll, fuel, dist), middle)
+                 for a, b, toll, fuel, dist, middle in data["edges"]}
+        return cls(data["rank"], edges)
+
+    @classmethod
+    def load_or_build(cls, adjacency_list, filename):
+        fingerprint = graph_fingerprint(adjacency_list)
+        hierarchy = cls.load(filename, fingerprint)
+        if hierarchy is None:
+            hierarchy = cls.build(adjacency_list)
+            hierarchy.save(filename, fingerprint)
+        return hierarchy
+
+
+class Graph:
+    """Planeador com Contraction Hierarchies (mesma interface dos restantes Graph)"""
+
+    def __init__(self, adjacency_list, hierarchy=None, route_cache=None):
+        self.adjacency_list = adjacency_list
+        self.route_cache = route_cache
+        self.hierarchy = hierarchy or ContractionHierarchy.build(adjacency_list)
+        self.stats = None
+        self.on_expand = None
+
+    @timed("search_time")
+    def ch_query(self, start, goal):
+        if not connected(self.adjacency_list, start, goal):
+            return (None, None, None, None)
+        return self.hierarchy.query(start, goal, self.stats, self.on_expand)
+
+    @cached_routes("CH")
+    @collects_stats
+    def find_top_paths(self, start, goal, num_paths=5, max_attempts=30, with_stats=False):
+        """A hierarquia devolve apenas o caminho ótimo (lista com um elemento)"""
+        path, toll, fuel, dist = self.ch_query(start, goal)
+        return [] if path is None else [(path, toll, fuel, dist)]
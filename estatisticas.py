@@ -0,0 +1,113 @@
+import functools
+import inspect
+import threading
+import time
+
+
+class SearchStats:
+    """Contadores de uma pesquisa (opcionais: só existem se o planeador os pedir).
+
+    Os planeadores verificam `self.stats is not None` antes de contar, e os
+    callbacks on_expand(nó) / on_relax(nó, vizinho, custo) só são chamados se
+    estiverem definidos, por isso desligados não custam nada além de um teste.
+    """
+
+    __slots__ = ("expanded", "relaxations", "heap_pushes", "heap_pops", "stale_pops",
+                 "peak_open", "heuristic_time", "search_time")
+
+    def __init__(self):
+        self.expanded = 0
+        self.relaxations = 0
+        self.heap_pushes = 0
+        self.heap_pops = 0
+        self.stale_pops = 0
+        self.peak_open = 0
+        self.heuristic_time = 0.0
+        self.search_time = 0.0
+
+    def observe_open(self, size):
+        if size > self.peak_open:
+            self.peak_open = size
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def merge(self, other):
+        """Acumula os contadores de outra pesquisa (o pico fica no máximo)"""
+        for name in self.__slots__:
+            if name == "peak_open":
+                self.peak_open = max(self.peak_open, other.peak_open)
+            else:
+                setattr(self, name, getattr(self, name) + getattr(other, name))
+        return self
+
+    def summary(self):
+        """Texto curto para a caixa de resultados da GUI"""
+        return (f"Nós expandidos: {self.expanded} | Relaxações: {self.relaxations}\n"
+                f"Heap: {self.heap_pushes} inserções, {self.heap_pops} remoções "
+                f"({self.stale_pops} obsoletas), pico {self.peak_open}\n"
+                f"Heurística: {self.heuristic_time * 1000:.2f} ms | "
+                f"Pesquisa: {self.search_time * 1000:.2f} ms")
+
+
+class SearchCancelled(Exception):
+    """Levantada por um callback para abortar a pesquisa em curso"""
+
+
+class SearchProgress:
+    """Callback on_expand que conta expansões e aborta a pesquisa quando cancelado.
+
+    A pesquisa corre numa thread de trabalho; a GUI lê `expanded` e chama
+    cancel(), e a próxima expansão levanta SearchCancelled.
+    """
+
+    def __init__(self):
+        self.expanded = 0
+        self.cancelled = threading.Event()
+
+    def __call__(self, node):
+        self.expanded += 1
+        if self.cancelled.is_set():
+            raise SearchCancelled()
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+def timed(field):
+    """Decorador: soma a duração do método ao campo `field` de self.stats (se ativo)"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            stats = self.stats
+            if stats is None:
+                return method(self, *args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                setattr(stats, field, getattr(stats, field) + time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def collects_stats(method):
+    """Decorador de find_top_paths: com with_stats=True (por nome ou posição) a
+    chamada conta num SearchStats novo e devolve (caminhos, stats).
+
+    O self.stats anterior é reposto no fim, por isso as chamadas seguintes sem
+    with_stats não continuam a contar no objeto desta.
+    """
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not signature.bind(self, *args, **kwargs).arguments.get("with_stats"):
+            return method(self, *args, **kwargs)
+        previous = self.stats
+        self.stats = stats = SearchStats()
+        try:
+            return method(self, *args, **kwargs), stats
+        finally:
+            self.stats = previous
+    return wrapper
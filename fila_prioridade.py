@@ -0,0 +1,99 @@
+class IndexedHeap:
+    """Heap binária mínima indexada: push/update/remove de um item em O(log n)"""
+
+    def __init__(self):
+        self.heap = []        # [(chave, item)]
+        self.position = {}    # item -> índice na heap
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, item):
+        return item in self.position
+
+    def __bool__(self):
+        return bool(self.heap)
+
+    def clear(self):
+        self.heap.clear()
+        self.position.clear()
+
+    def top(self):
+        """Devolve (chave, item) com a menor chave sem o remover"""
+        return self.heap[0]
+
+    def top_key(self):
+        return self.heap[0][0]
+
+    def key(self, item):
+        return self.heap[self.position[item]][0]
+
+    def push(self, item, key):
+        """Insere o item ou atualiza a sua chave se já estiver na heap"""
+        pos = self.position.get(item)
+        if pos is None:
+            self.heap.append((key, item))
+            self.position[item] = len(self.heap) - 1
+            self._sift_up(len(self.heap) - 1)
+            return
+        old_key = self.heap[pos][0]
+        self.heap[pos] = (key, item)
+        if key < old_key:
+            self._sift_up(pos)
+        else:
+            self._sift_down(pos)
+
+    update = push
+
+    def pop(self):
+        """Remove e devolve (chave, item) com a menor chave"""
+        entry = self.heap[0]
+        self._remove_at(0)
+        return entry
+
+    def remove(self, item):
+        """Remove o item (se existir)"""
+        pos = self.position.get(item)
+        if pos is not None:
+            self._remove_at(pos)
+
+    def _remove_at(self, pos):
+        item = self.heap[pos][1]
+        last = self.heap.pop()
+        del self.position[item]
+        if pos < len(self.heap):
+            self.heap[pos] = last
+            self.position[last[1]] = pos
+            self._sift_up(pos)
+            self._sift_down(self.position[last[1]])
+
+    def _sift_up(self, pos):
+        heap, position = self.heap, self.position
+        entry = heap[pos]
+        while pos > 0:
+            parent = (pos - 1) >> 1
+            if heap[parent][0] <= entry[0]:
+                break
+            heap[pos] = heap[parent]
+            position[heap[pos][1]] = pos
+            pos = parent
+        heap[pos] = entry
+        position[entry[1]] = pos
+
+    def _sift_down(self, pos):
+        heap, position = self.heap, self.position
+        size = len(heap)
+        entry = heap[pos]
+        while True:
+            child = 2 * pos + 1
+            if child >= size:
+                break
+            if child + 1 < size and heap[child + 1][0] < heap[child][0]:
+                child += 1
+            if entry[0] <= heap[child][0]:
+                break
+            heap[pos] = heap[child]
+            position[heap[pos][1]] = pos
+            pos = child
+        heap[pos] = entry
+        position[entry[1]] = pos
@@ -0,0 +1,293 @@
+import hashlib
+import mmap
+import os
+import shutil
+import struct
+import sys
+from array import array
+from collections import deque
+from collections.abc import Mapping
+from math import inf
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional
+    np = None
+
+
+class CompactGraph(Mapping):
+    """Grafo em formato CSR (compressed sparse row) com cidades mapeadas para ids inteiros.
+
+    Comporta-se como o dicionário de adjacências devolvido por load_graph_from_csv
+    (graph[cidade] -> [(vizinho, (portagem, combustível, distância)), ...]), por isso
+    pode ser passado diretamente aos Graph de CODIGOparacsv, DinamicAStar e LRTA.
+
+    As caches partilhadas (heurísticas, conectividade, rotas) identificam o grafo
+    pelo contador `version`; quem alterar as colunas no lugar deve chamar touch().
+    """
+
+    def __init__(self, names, offsets, targets, toll, fuel, dist):
+        self.names = [sys.intern(name) for name in names]
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.offsets = offsets
+        self.targets = targets
+        self.toll = toll
+        self.fuel = fuel
+        self.dist = dist
+        self.version = 0
+
+    @classmethod
+    def from_edges(cls, names, sources, targets, toll, fuel, dist):
+        """Constrói o CSR a partir de colunas de arestas (ids de origem/destino)"""
+        n = len(names)
+        counts = [0] * (n + 1)
+        for s in sources:
+            counts[s + 1] += 1
+        for i in range(n):
+            counts[i + 1] += counts[i]
+        offsets = array('q', counts)
+
+        m = len(sources)
+        position = counts[:-1]
+        out_targets = array('i', bytes(4 * m))
+        out_toll = array('d', bytes(8 * m))
+        out_fuel = array('d', bytes(8 * m))
+        out_dist = array('d', bytes(8 * m))
+        for e in range(m):
+            s = sources[e]
+            p = position[s]
+            position[s] = p + 1
+            out_targets[p] = targets[e]
+            out_toll[p] = toll[e]
+            out_fuel[p] = fuel[e]
+            out_dist[p] = dist[e]
+        return cls(names, offsets, out_targets, out_toll, out_fuel, out_dist)
+
+    @classmethod
+    def from_adjacency(cls, adjacency_list):
+        """Converte um dicionário de adjacências (formato de load_graph_from_csv)"""
+        names = list(adjacency_list)
+        index = {name: i for i, name in enumerate(names)}
+        for neighbors in list(adjacency_list.values()):
+            for neighbor, _ in neighbors:
+                if neighbor not in index:
+                    index[neighbor] = len(names)
+                    names.append(neighbor)
+
+        sources, targets = array('i'), array('i')
+        toll, fuel, dist = array('d'), array('d'), array('d')
+        for node, neighbors in adjacency_list.items():
+            i = index[node]
+            for neighbor, costs in neighbors:
+                sources.append(i)
+                targets.append(index[neighbor])
+                toll.append(costs[0])
+                fuel.append(costs[1])
+                dist.append(costs[2])
+        return cls.from_edges(names, sources, targets, toll, fuel, dist)
+
+    def touch(self):
+        """Regista uma alteração às colunas: as caches por versão deixam de servir"""
+        self.version += 1
+
+    # Interface de dicionário (compatível com os planeadores existentes)
+
+    def __getitem__(self, node):
+        return self.neighbors_of(self.index[node])
+
+    def __contains__(self, node):
+        return node in self.index
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def neighbors_of(self, i):
+        """Lista [(vizinho, (portagem, combustível, distância))] do nó com id i"""
+        a, b = self.offsets[i], self.offsets[i + 1]
+        return list(zip(map(self.names.__getitem__, self.targets[a:b]),
+                        zip(self.toll[a:b], self.fuel[a:b], self.dist[a:b])))
+
+    # Interface por ids inteiros (para ciclos internos)
+
+    def edge_range(self, i):
+        """Intervalo de índices de arestas que saem do nó i"""
+        return range(self.offsets[i], self.offsets[i + 1])
+
+    @property
+    def num_edges(self):
+        return len(self.targets)
+
+    def propagate_distances(self, goal):
+        """compute_heuristic dos planeadores sobre ids: fila FIFO com relaxação pelas
+        arestas de saída, sem criar listas de vizinhos. Devolve {cidade: distância}."""
+        values = [inf] * len(self.names)
+        source = self.index[goal]
+        values[source] = 0
+        offsets, targets, dist = self.offsets, self.targets, self.dist
+        queue = deque([source])
+        pop, push = queue.popleft, queue.append
+        while queue:
+            current = pop()
+            base = values[current]
+            for e in range(offsets[current], offsets[current + 1]):
+                candidate = base + dist[e]
+                neighbor = targets[e]
+                if values[neighbor] > candidate:
+                    values[neighbor] = candidate
+                    push(neighbor)
+        return dict(zip(self.names, values))
+
+    def as_numpy(self):
+        """Vistas NumPy (sem cópia) das colunas CSR"""
+        if np is None:
+            raise RuntimeError("NumPy não está instalado.")
+        return {
+            "offsets": np.frombuffer(self.offsets, dtype=np.int64),
+            "targets": np.frombuffer(self.targets, dtype=np.int32),
+            "toll": np.frombuffer(self.toll, dtype=np.float64),
+            "fuel": np.frombuffer(self.fuel, dtype=np.float64),
+            "dist": np.frombuffer(self.dist, dtype=np.float64),
+        }
+
+    def nbytes(self):
+        """Memória ocupada pelas colunas de arestas e offsets (em bytes)"""
+        return sum(col.itemsize * len(col) for col in
+                   (self.offsets, self.targets, self.toll, self.fuel, self.dist))
+
+
+def load_compact_graph(filename, dedup=None, report=None, progress=None):
+    """Carrega o CSV (ou CSV.gz) diretamente para um CompactGraph, em streaming"""
+    from carregador import load_compact_streaming
+    return load_compact_streaming(filename, dedup, report, progress=progress)
+
+
+# Snapshot binário (mmap) do grafo compilado
+#
+# Formato: cabeçalho fixo, tabela de nomes (UTF-8 separados por '\n') e as colunas
+# CSR na ordem de bytes nativa, alinhadas a 8 bytes:
+#   offsets int64[n+1] | toll float64[m] | fuel float64[m] | dist float64[m] | targets int32[m]
+
+SNAPSHOT_MAGIC = b"GRAFOCSR"
+SNAPSHOT_VERSION = 1
+_HEADER = struct.Struct("=8sIIQQQ32sQ")
+
+
+def _file_hash(filename):
+    digest = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.digest()
+
+
+def _padding(size):
+    return (-size) % 8
+
+
+def save_snapshot(graph, snapshot_path, source_filename):
+    """Escreve o grafo compilado em disco, associado ao CSV de origem"""
+    stat = os.stat(source_filename)
+    names_blob = "\n".join(graph.names).encode("utf-8")
+    header = _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(graph.names),
+                          graph.num_edges, stat.st_size, stat.st_mtime_ns,
+                          _file_hash(source_filename), len(names_blob))
+
+    # As colunas já no tipo certo são escritas sem cópia
+    columns = [column if memoryview(column).format == fmt else array(fmt, column)
+               for fmt, column in (('q', graph.offsets), ('d', graph.toll), ('d', graph.fuel),
+                                   ('d', graph.dist), ('i', graph.targets))]
+    # Temporário por processo: trabalhadores do portfólio/lote podem compilar ao mesmo tempo
+    tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(names_blob)
+        f.write(b"\0" * _padding(_HEADER.size + len(names_blob)))
+        for column in columns:
+            f.write(memoryview(column).cast('B'))
+    os.replace(tmp_path, snapshot_path)
+
+
+def _refresh_header(snapshot_path, header):
+    """Regrava o snapshot com outro cabeçalho, numa cópia que substitui o original"""
+    tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    try:
+        with open(snapshot_path, "rb") as src, open(tmp_path, "wb") as dst:
+            src.seek(_HEADER.size)
+            dst.write(header)
+            shutil.copyfileobj(src, dst, 1 << 20)
+        os.replace(tmp_path, snapshot_path)
+    except OSError:
+        # Pasta só de leitura: o snapshot continua válido, o hash volta a ser comparado
+        pass
+
+
+def _snapshot_is_fresh(snapshot_path, source_filename):
+    """Verifica tamanho/mtime do CSV; em caso de dúvida compara o hash"""
+    try:
+        with open(snapshot_path, "rb") as f:
+            fields = _HEADER.unpack(f.read(_HEADER.size))
+        magic, version, _, _, size, mtime_ns, digest, _ = fields
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            return False
+
+        stat = os.stat(source_filename)
+        if stat.st_size != size:
+            return False
+        if stat.st_mtime_ns == mtime_ns:
+            return True
+        if _file_hash(source_filename) != digest:
+            return False
+    except (OSError, struct.error):
+        return False
+
+    # Só o mtime mudou (ex.: touch): atualiza o cabeçalho e reaproveita
+    _refresh_header(snapshot_path, _HEADER.pack(*fields[:5], stat.st_mtime_ns, *fields[6:]))
+    return True
+
+
+def open_snapshot(snapshot_path):
+    """Abre o snapshot com mmap; as colunas são vistas sobre as páginas partilhadas"""
+    with open(snapshot_path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    _, _, n, m, _, _, _, names_len = _HEADER.unpack_from(mapped, 0)
+    pos = _HEADER.size
+    names = bytes(mapped[pos:pos + names_len]).decode("utf-8").split("\n") if n else []
+    pos += names_len + _padding(_HEADER.size + names_len)
+
+    view = memoryview(mapped)
+    columns = []
+    for fmt, count in (('q', n + 1), ('d', m), ('d', m), ('d', m), ('i', m)):
+        size = struct.calcsize(fmt) * count
+        columns.append(view[pos:pos + size].cast(fmt))
+        pos += size
+    offsets, toll, fuel, dist, targets = columns
+
+    graph = CompactGraph(names, offsets, targets, toll, fuel, dist)
+    graph.snapshot = mapped
+    return graph
+
+
+def load_graph_cached(filename, snapshot_path=None, dedup=None, progress=None):
+    """Carrega o grafo a partir do snapshot, recompilando-o se o CSV tiver mudado
+
+    progress é passado ao carregamento em streaming quando é preciso recompilar."""
+    if snapshot_path is None:
+        suffix = f".{dedup}" if dedup else ""
+        snapshot_path = f"{filename}{suffix}.grafo"
+    if not os.path.exists(filename):
+        print(f"Erro: Arquivo '{filename}' não encontrado.")
+        return None
+
+    if not _snapshot_is_fresh(snapshot_path, filename):
+        graph = load_compact_graph(filename, dedup, progress=progress)
+        if graph is None:
+            return None
+        try:
+            save_snapshot(graph, snapshot_path, filename)
+        except OSError:
+            return graph   # sem permissão de escrita: fica o grafo em memória
+    return open_snapshot(snapshot_path)
@@ -1,28 +1,49 @@
+import queue
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox
-from CODIGOparacsv import Graph, load_graph_from_csv
+from CODIGOparacsv import Graph
+from grafo_compacto import load_graph_cached
 from LRTA import Graph as LRTA_Graph, load_graph_from_csv as load_graph_lrta
 from DinamicAStar import Graph as DStar_Graph, load_graph_from_csv as load_graph_dstar
-import networkx as nx
-import matplotlib.pyplot as plt
+from contraction_hierarchies import ContractionHierarchy, Graph as CH_Graph
+from cache_rotas import RouteCache
+from conectividade import connectivity_for
+from estatisticas import SearchCancelled, SearchProgress
+from mapa_rotas import RouteMap, load_or_compute_layout
+from portfolio import Portfolio, PortfolioPlanner
+
+# Intervalo (ms) entre verificações da fila de resultados da thread de pesquisa
+POLL_MS = 50
+
 
 class App:
     def __init__(self, root):
         self.root = root
         self.root.title("Planeador de Rotas")
 
-        # Carregar cidades
-        self.graph_data = load_graph_from_csv("cities_nodes_special.csv")
+        # Carregar cidades (snapshot binário, recompilado se o CSV mudar)
+        self.graph_data = load_graph_cached("cities_nodes_special.csv", dedup="pareto")
         if not self.graph_data:
             messagebox.showerror("Erro", "Erro ao carregar o ficheiro CSV.")
             self.root.destroy()
             return
+        self.hierarchy = None  # Contraction Hierarchies, construída no primeiro uso
+        self.portfolio = None  # processos do modo portfólio, arrancados no primeiro uso
+        # Resultados anteriores (persistidos durante um dia)
+        self.route_cache = RouteCache(ttl=24 * 3600, path="cities_nodes_special.csv.routes.sqlite")
+
+        # Pesquisa em curso: (id, SearchProgress); os resultados chegam por esta fila
+        self.results = queue.Queue()
+        self.job_id = 0
+        self.current = None
 
         self.cities = sorted(self.graph_data.keys())
+        self.connectivity = connectivity_for(self.graph_data)
 
         # Algoritmo
         ttk.Label(root, text="Escolher algoritmo:").grid(row=0, column=0, padx=10, pady=10)
-        self.algorithm = ttk.Combobox(root, values=["A*", "LRTA*", "D*"], state="readonly")
+        self.algorithm = ttk.Combobox(root, values=["A*", "LRTA*", "D*", "CH", "Portfólio"], state="readonly")
         self.algorithm.grid(row=0, column=1)
         self.algorithm.set("A*")
 
@@ -37,15 +58,37 @@ class App:
         self.end_combo = ttk.Combobox(root, values=self.cities, state="readonly")
         self.end_combo.grid(row=2, column=1)
         self.end_combo.set(self.cities[1])
-
-        # Botão
-        self.run_button = ttk.Button(root, text="Calcular Caminho", command=self.run_algorithm)
-        self.run_button.grid(row=3, columnspan=2, pady=20)
+        self.start_combo.bind("<<ComboboxSelected>>", self.update_destinations)
+        self.update_destinations()
+
+        # Mudar a consulta a meio descarta a pesquisa em curso
+        for combo in (self.algorithm, self.start_combo, self.end_combo):
+            combo.bind("<<ComboboxSelected>>", self.on_query_changed, add="+")
+
+        # Botões
+        buttons = ttk.Frame(root)
+        buttons.grid(row=3, columnspan=2, pady=20)
+        self.run_button = ttk.Button(buttons, text="Calcular Caminho", command=self.run_algorithm)
+        self.run_button.pack(side=tk.LEFT, padx=5)
+        self.cancel_button = ttk.Button(buttons, text="Cancelar", command=self.cancel_search,
+                                        state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
 
         # Resultados
         self.result_box = tk.Text(root, width=60, height=20)
         self.result_box.grid(row=4, columnspan=2)
 
+        # Progresso
+        self.progress_bar = ttk.Progressbar(root, mode="indeterminate", length=300)
+        self.progress_bar.grid(row=5, column=0, padx=10, pady=10)
+        self.progress_label = ttk.Label(root, text="")
+        self.progress_label.grid(row=5, column=1, sticky="w")
+
+        # Mapa: layout calculado uma vez e persistido; o canvas é reutilizado
+        positions = load_or_compute_layout(self.graph_data, "cities_nodes_special.csv.layout.json")
+        self.route_map = RouteMap(root, self.graph_data, positions)
+        self.route_map.widget().grid(row=0, column=2, rowspan=6, padx=10, pady=10)
+
     def run_algorithm(self):
         alg = self.algorithm.get()
         start = self.start_combo.get()
@@ -61,23 +104,135 @@ class App:
             self.result_box.insert(tk.END, "Erro: Uma ou ambas as cidades não existem.\n")
             return
 
-        # Escolher o algoritmo
-        if alg == "A*":
-            graph = Graph(self.graph_data)
-        elif alg == "LRTA*":
-            graph = LRTA_Graph(self.graph_data)
-        elif alg == "D*":
-            graph = DStar_Graph(self.graph_data)
-        else:
+        if alg not in ("A*", "LRTA*", "D*", "CH", "Portfólio"):
             self.result_box.insert(tk.END, f"Algoritmo {alg} ainda não está implementado.\n")
             return
 
-        paths = graph.find_top_paths(start, end)
+        # Só há uma pesquisa ativa: a anterior é cancelada e o seu resultado ignorado
+        self.discard_search()
+        self.job_id += 1
+        progress = SearchProgress()
+        self.current = (self.job_id, progress)
+        threading.Thread(target=self.search_worker, args=(self.job_id, progress, alg, start, end),
+                         daemon=True).start()
+
+        self.run_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+        self.progress_bar.start(10)
+        self.progress_label.config(text="A pesquisar…")
+        self.root.after(POLL_MS, self.poll_results)
+
+    def make_planner(self, alg):
+        if alg == "A*":
+            return Graph(self.graph_data, route_cache=self.route_cache)
+        if alg == "LRTA*":
+            # Modo de convergência: o que se aprende por destino fica em disco
+            return LRTA_Graph(self.graph_data, route_cache=self.route_cache,
+                              learning_dir="cities_nodes_special.csv.lrta")
+        if alg == "D*":
+            return DStar_Graph(self.graph_data, route_cache=self.route_cache)
+        if alg == "Portfólio":
+            if self.portfolio is None:
+                self.portfolio = Portfolio("cities_nodes_special.csv", dedup="pareto",
+                                           record_file="cities_nodes_special.csv.portfolio.json")
+            return PortfolioPlanner(self.portfolio)
+        if self.hierarchy is None:
+            self.hierarchy = ContractionHierarchy.load_or_build(
+                self.graph_data, "cities_nodes_special.csv.ch.json")
+        return CH_Graph(self.graph_data, self.hierarchy, route_cache=self.route_cache)
+
+    def search_worker(self, job_id, progress, alg, start, end):
+        """Corre na thread de trabalho; nunca toca nos widgets, só na fila"""
+        try:
+            graph = self.make_planner(alg)
+            graph.on_expand = progress
+            paths, stats = graph.find_top_paths(start, end, with_stats=True)
+            self.results.put((job_id, "done", (paths, stats, getattr(graph, "last_result", None))))
+        except SearchCancelled:
+            self.results.put((job_id, "cancelled", None))
+        except Exception as e:  # a thread não pode deixar a GUI à espera
+            self.results.put((job_id, "error", e))
+
+    def poll_results(self):
+        """Lê a fila da thread de pesquisa na thread do Tk (via root.after)"""
+        while True:
+            try:
+                job_id, status, payload = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if self.current is not None and job_id == self.current[0]:
+                self.current = None
+                self.search_finished(status, payload)
+            # Resultados de pesquisas já descartadas são ignorados
+
+        if self.current is not None:
+            progress = self.current[1]
+            state = "A cancelar…" if progress.cancelled.is_set() else "A pesquisar…"
+            self.progress_label.config(text=f"{state} {progress.expanded} nós expandidos")
+            self.root.after(POLL_MS, self.poll_results)
+
+    def cancel_search(self):
+        if self.current is not None:
+            self.current[1].cancel()
+            self.cancel_button.config(state=tk.DISABLED)
+
+    def discard_search(self):
+        """Cancela a pesquisa em curso sem esperar pelo resultado"""
+        if self.current is not None:
+            self.current[1].cancel()
+            self.current = None
+        self.reset_progress()
+
+    def update_destinations(self, event=None):
+        """Só deixa escolher destinos na mesma componente conexa da origem"""
+        start = self.start_combo.get()
+        if self.connectivity.count <= 1 or not start:
+            return
+        reachable = sorted(self.connectivity.members(start))
+        self.end_combo.config(values=reachable)
+        if self.end_combo.get() not in reachable:
+            others = [city for city in reachable if city != start]
+            self.end_combo.set(others[0] if others else start)
+
+    def on_query_changed(self, event=None):
+        if self.current is not None:
+            self.discard_search()
+            self.result_box.delete("1.0", tk.END)
+            self.result_box.insert(tk.END, "Consulta alterada: pesquisa anterior descartada.\n")
+
+    def reset_progress(self, text=""):
+        self.progress_bar.stop()
+        self.progress_label.config(text=text)
+        self.run_button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.DISABLED)
+
+    def search_finished(self, status, payload):
+        if status == "cancelled":
+            self.reset_progress("Pesquisa cancelada.")
+            self.result_box.insert(tk.END, "Pesquisa cancelada.\n")
+            return
+        if status == "error":
+            self.reset_progress("Erro na pesquisa.")
+            self.result_box.insert(tk.END, f"Erro: {payload}\n")
+            return
+
+        paths, stats, race = payload
+        self.reset_progress(f"Concluído: {stats.expanded} nós expandidos")
+        if race is not None and race["winner"] is not None:
+            how = "previsto" if race["routed"] else ("ótimo" if race["optimal"] else "melhor no prazo")
+            self.result_box.insert(tk.END, f"Portfólio: venceu {race['winner']} ({how}) "
+                                           f"em {race['elapsed_ms']:.1f} ms\n")
+        cache = self.route_cache.stats()
+        self.result_box.insert(tk.END, f"Cache de rotas: {cache['hits']} acertos, "
+                                       f"{cache['misses']} falhas ({cache['hit_rate']:.0%})\n")
 
         if not paths:
             self.result_box.insert(tk.END, "Nenhum caminho encontrado.\n")
+            self.result_box.insert(tk.END, stats.summary() + "\n")
             return
 
+        self.result_box.insert(tk.END, stats.summary() + "\n")
+
         # Mostrar os caminhos encontrados
         for i, (path, toll, fuel, dist) in enumerate(paths, 1):
             self.result_box.insert(tk.END, f"\n--- Caminho #{i} ---\n")
@@ -92,34 +247,7 @@ class App:
         self.draw_path_on_map(self.graph_data, best_path)
 
     def draw_path_on_map(self, graph_data, path):
-        G = nx.Graph()
-
-        # Adicionar todos os nós (para contexto visual)
-        for cidade, vizinhos in graph_data.items():
-            G.add_node(cidade)
-            for vizinho, custos in vizinhos:
-                G.add_edge(cidade, vizinho, weight=custos[2])
-
-        pos = nx.spring_layout(G, seed=42)
-
-        # Cores e estilos
-        edge_colors = []
-        for u, v in G.edges():
-            if u in path and v in path and abs(path.index(u) - path.index(v)) == 1:
-                edge_colors.append("blue")
-            else:
-                edge_colors.append("gray")
-
-        node_colors = ["orange" if n in path else "lightgray" for n in G.nodes]
-
-        plt.figure(figsize=(12, 8))
-        nx.draw(G, pos, with_labels=True, node_size=700,
-                node_color=node_colors, edge_color=edge_colors, width=2, font_size=8)
-
-        plt.title("Mapa com o Caminho Calculado")
-        plt.axis("off")
-        plt.tight_layout()
-        plt.show()
+        self.route_map.show_path(path)
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,231 @@
+import heapq
+import json
+import random
+from collections import defaultdict
+from math import inf
+
+
+def dijkstra(adjacency_list, source, cost_index=2):
+    """Distâncias mínimas desde source (cost_index: 0 portagem, 1 combustível, 2 distância)"""
+    distances = {source: 0}
+    heap = [(0, source)]
+    while heap:
+        d, current = heapq.heappop(heap)
+        if d > distances[current]:
+            continue
+        for neighbor, costs in adjacency_list.get(current, []):
+            nd = d + costs[cost_index]
+            if nd < distances.get(neighbor, inf):
+                distances[neighbor] = nd
+                heapq.heappush(heap, (nd, neighbor))
+    return distances
+
+
+def reverse_adjacency(adjacency_list):
+    """Lista de adjacências com todas as arestas invertidas"""
+    reverse = defaultdict(list)
+    for node, neighbors in adjacency_list.items():
+        reverse.setdefault(node, [])
+        for neighbor, costs in neighbors:
+            reverse[neighbor].append((node, costs))
+    return reverse
+
+
+class ALTHeuristic:
+    """Heurística ALT para um objetivo fixo, calculada a pedido em O(#landmarks).
+
+    Comporta-se como o dicionário self.heuristic dos planeadores, incluindo
+    escritas (o LRTA* atualiza valores aprendidos por cima dos limites ALT).
+    """
+
+    def __init__(self, index, goal):
+        self.index = index
+        self.goal = goal
+        self.learned = {}
+
+    def __getitem__(self, node):
+        value = self.learned.get(node)
+        if value is None:
+            value = self.index.bound(node, self.goal)
+        return value
+
+    def get(self, node, default=None):
+        if node in self.learned:
+            return self.learned[node]
+        if node not in self.index.forward:
+            return default
+        return self.index.bound(node, self.goal)
+
+    def __setitem__(self, node, value):
+        self.learned[node] = value
+
+    def __contains__(self, node):
+        return node in self.index.forward
+
+
+class LandmarkIndex:
+    """Pré-processamento ALT (A*, Landmarks, desigualdade triangular).
+
+    Para cada landmark L guarda d(L, v) (forward) e d(v, L) (backward); o limite
+    inferior de d(u, t) é o máximo de d(L, t) - d(L, u) e d(u, L) - d(t, L).
+    """
+
+    def __init__(self, landmarks, forward, backward):
+        self.landmarks = landmarks
+        self.forward = forward      # nó -> [d(L, nó) para cada landmark]
+        self.backward = backward    # nó -> [d(nó, L) para cada landmark]
+
+    @classmethod
+    def build(cls, adjacency_list, num_landmarks=8, strategy="farthest", seed=42):
+        """Escolhe os landmarks ("farthest" ou "avoid") e calcula as tabelas de distâncias"""
+        nodes = list(adjacency_list)
+        reverse = reverse_adjacency(adjacency_list)
+        num_landmarks = min(num_landmarks, len(nodes))
+        rng = random.Random(seed)
+
+        landmarks, from_l, to_l = [], [], []
+
+        def add(landmark):
+            landmarks.append(landmark)
+            from_l.append(dijkstra(adjacency_list, landmark))
+            to_l.append(dijkstra(reverse, landmark))
+
+        if strategy == "farthest":
+            # Farthest-point: cada novo landmark maximiza a distância ao mais próximo
+            first = dijkstra(adjacency_list, rng.choice(nodes))
+            add(max(nodes, key=lambda v: (first.get(v, inf) < inf, first.get(v, 0))))
+            while len(landmarks) < num_landmarks:
+                candidate = max(
+                    (v for v in nodes if v not in landmarks),
+                    key=lambda v: min(d.get(v, inf) for d in from_l))
+                add(candidate)
+        elif strategy == "avoid":
+            add(rng.choice(nodes))
+            while len(landmarks) < num_landmarks:
+                partial = cls(landmarks, *cls._tables(nodes, from_l, to_l))
+                add(cls._avoid_candidate(adjacency_list, nodes, landmarks, partial, rng))
+        else:
+            raise ValueError(f"Estratégia de landmarks desconhecida: {strategy}")
+
+        return cls(landmarks, *cls._tables(nodes, from_l, to_l))
+
+    @staticmethod
+    def _tables(nodes, from_l, to_l):
+        forward = {v: [d.get(v, inf) for d in from_l] for v in nodes}
+        backward = {v: [d.get(v, inf) for d in to_l] for v in nodes}
+        return forward, backward
+
+    @staticmethod
+    def _avoid_candidate(adjacency_list, nodes, landmarks, partial, rng):
+        """Seleção "avoid" (Goldberg & Werneck): desce pela árvore de caminhos
+        mínimos de uma raiz aleatória até à folha da subárvore com pior heurística."""
+        root = rng.choice(nodes)
+        distances = {root: 0}
+        parent = {}
+        heap = [(0, root)]
+        order = []
+        while heap:
+            d, current = heapq.heappop(heap)
+            if d > distances[current]:
+                continue
+            order.append(current)
+            for neighbor, costs in adjacency_list.get(current, []):
+                nd = d + costs[2]
+                if nd < distances.get(neighbor, inf):
+                    distances[neighbor] = nd
+                    parent[neighbor] = current
+                    heapq.heappush(heap, (nd, neighbor))
+
+        size = {v: distances[v] - partial.bound(root, v) for v in order}
+        children = defaultdict(list)
+        for v in reversed(order):
+            if v in parent:
+                children[parent[v]].append(v)
+        blocked = set(landmarks)
+        for v in reversed(order):
+            if any(c in blocked for c in children[v]) or v in blocked:
+                blocked.add(v)
+                size[v] = 0
+                continue
+            size[v] += sum(size[c] for c in children[v])
+
+        current = root
+        while children[current]:
+            best = max(children[current], key=lambda c: size[c])
+            if size[best] <= 0:
+                break
+            current = best
+        if current in landmarks:
+            current = rng.choice([v for v in nodes if v not in landmarks])
+        return current
+
+    def bound(self, u, t):
+        """Limite inferior admissível de d(u, t)"""
+        if u == t:
+            return 0
+        fu, ft = self.forward.get(u), self.forward.get(t)
+        bu, bt = self.backward.get(u), self.backward.get(t)
+        if fu is None or ft is None:
+            return 0
+        best = 0
+        for i in range(len(self.landmarks)):
+            # d(L, t) - d(L, u)
+            if ft[i] == inf:
+                if fu[i] < inf:
+                    return inf
+            elif fu[i] < inf and ft[i] - fu[i] > best:
+                best = ft[i] - fu[i]
+            # d(u, L) - d(t, L)
+            if bu[i] == inf:
+                if bt[i] < inf:
+                    return inf
+            elif bt[i] < inf and bu[i] - bt[i] > best:
+                best = bu[i] - bt[i]
+        return best
+
+    def heuristic_for(self, goal):
+        """Heurística (tipo dicionário) para o objetivo dado, sem pré-processamento"""
+        return ALTHeuristic(self, goal)
+
+    def save(self, filename, fingerprint=None):
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fingerprint, "landmarks": self.landmarks,
+                       "forward": self.forward, "backward": self.backward}, f)
+
+    @classmethod
+    def load(cls, filename, fingerprint=None):
+        """Lê as tabelas gravadas; devolve None se pertencerem a outro grafo"""
+        try:
+            with open(filename, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if fingerprint is not None and data.get("fingerprint") != fingerprint:
+            return None
+        return cls(data["landmarks"], data["forward"], data["backward"])
+
+    @classmethod
+    def load_or_build(cls, adjacency_list, filename, **options):
+        """Reaproveita as tabelas persistidas ou calcula-as e grava-as"""
+        fingerprint = graph_fingerprint(adjacency_list)
+        index = cls.load(filename, fingerprint)
+        if index is None:
+            index = cls.build(adjacency_list, **options)
+            index.save(filename, fingerprint)
+        return index
+
+
+def graph_fingerprint(adjacency_list):
+    """Resumo barato do grafo: nº de nós, nº de arestas e a soma de cada coluna de
+    custos (portagem, combustível, distância). Os ficheiros persistidos (landmarks,
+    hierarquias, aprendizagem) guardam totais de portagem/combustível, por isso
+    uma alteração só a essas colunas também os tem de invalidar."""
+    edges = 0
+    totals = [0.0, 0.0, 0.0]
+    for neighbors in adjacency_list.values():
+        edges += len(neighbors)
+        for _, costs in neighbors:
+            totals[0] += costs[0]
+            totals[1] += costs[1]
+            totals[2] += costs[2]
+    return [len(adjacency_list), edges, *(round(total, 6) for total in totals)]
@@ -0,0 +1,143 @@
+import json
+
+import networkx as nx
+import numpy as np
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.collections import LineCollection
+from matplotlib.figure import Figure
+
+from landmarks import graph_fingerprint
+
+# Acima deste nº de cidades só as cidades do caminho levam nome
+LABEL_LIMIT = 200
+
+BASE_EDGE = (0.5, 0.5, 0.5, 0.6)
+PATH_EDGE = (0.0, 0.0, 1.0, 1.0)
+BASE_NODE = (0.83, 0.83, 0.83, 1.0)
+PATH_NODE = (1.0, 0.65, 0.0, 1.0)
+
+
+def build_nx_graph(adjacency_list):
+    """Grafo não dirigido do NetworkX com a distância como peso"""
+    G = nx.Graph()
+    for city, neighbors in adjacency_list.items():
+        G.add_node(city)
+        for neighbor, costs in neighbors:
+            G.add_edge(city, neighbor, weight=costs[2])
+    return G
+
+
+def compute_layout(adjacency_list, seed=42):
+    """Posições do spring_layout (cálculo caro: feito uma vez por conjunto de dados)"""
+    pos = nx.spring_layout(build_nx_graph(adjacency_list), seed=seed)
+    return {city: (float(x), float(y)) for city, (x, y) in pos.items()}
+
+
+def save_layout(filename, positions, fingerprint=None):
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump({"fingerprint": fingerprint, "positions": positions}, f)
+
+
+def load_layout(filename, fingerprint=None):
+    """Lê as posições gravadas; devolve None se pertencerem a outro grafo"""
+    try:
+        with open(filename, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if fingerprint is not None and data.get("fingerprint") != fingerprint:
+        return None
+    return {city: tuple(xy) for city, xy in data["positions"].items()}
+
+
+def load_or_compute_layout(adjacency_list, filename, seed=42):
+    """Reaproveita o layout persistido ou calcula-o e grava-o"""
+    fingerprint = graph_fingerprint(adjacency_list)
+    positions = load_layout(filename, fingerprint)
+    if positions is None:
+        positions = compute_layout(adjacency_list, seed)
+        save_layout(filename, positions, fingerprint)
+    return positions
+
+
+class RouteMap:
+    """Mapa embutido na janela Tk: o grafo é desenhado uma vez e cada novo
+    caminho só muda a cor das arestas e cidades que entram ou saem dele."""
+
+    def __init__(self, master, adjacency_list, positions, figsize=(8, 6)):
+        self.positions = positions
+        self.cities = list(positions)
+        self.city_index = {city: i for i, city in enumerate(self.cities)}
+
+        # Uma aresta por par não ordenado; (u, v) e (v, u) apontam para o mesmo índice
+        self.edge_index = {}
+        segments = []
+        for city, neighbors in adjacency_list.items():
+            for neighbor, _ in neighbors:
+                if (city, neighbor) in self.edge_index:
+                    continue
+                self.edge_index[(city, neighbor)] = self.edge_index[(neighbor, city)] = len(segments)
+                segments.append((positions[city], positions[neighbor]))
+
+        self.edge_colors = np.tile(BASE_EDGE, (len(segments), 1))
+        self.edge_widths = np.full(len(segments), 1.0)
+        self.node_colors = np.tile(BASE_NODE, (len(self.cities), 1))
+        self.path_edges = set()
+        self.path_nodes = set()
+        self.path_labels = []
+
+        self.figure = Figure(figsize=figsize)
+        self.ax = self.figure.add_subplot()
+        self.ax.set_title("Mapa com o Caminho Calculado")
+        self.ax.set_axis_off()
+
+        self.edges = LineCollection(segments, colors=self.edge_colors,
+                                    linewidths=self.edge_widths, zorder=1)
+        self.ax.add_collection(self.edges)
+        xy = np.array([positions[city] for city in self.cities])
+        node_size = 300 if len(self.cities) <= LABEL_LIMIT else 10
+        self.nodes = self.ax.scatter(xy[:, 0], xy[:, 1], s=node_size,
+                                     c=self.node_colors, zorder=2)
+        self.show_all_labels = len(self.cities) <= LABEL_LIMIT
+        if self.show_all_labels:
+            for city, (x, y) in positions.items():
+                self.ax.text(x, y, city, fontsize=7, ha="center", va="center", zorder=3)
+        self.ax.autoscale_view()
+        self.figure.tight_layout()
+
+        self.canvas = FigureCanvasTkAgg(self.figure, master=master)
+        self.canvas.draw()
+
+    def widget(self):
+        return self.canvas.get_tk_widget()
+
+    def show_path(self, path):
+        """Realça o caminho; só as arestas/cidades do caminho anterior e do novo mudam"""
+        new_edges = {self.edge_index[(u, v)] for u, v in zip(path, path[1:])
+                     if (u, v) in self.edge_index}
+        new_nodes = {self.city_index[city] for city in path if city in self.city_index}
+
+        for i in self.path_edges - new_edges:
+            self.edge_colors[i] = BASE_EDGE
+            self.edge_widths[i] = 1.0
+        for i in new_edges - self.path_edges:
+            self.edge_colors[i] = PATH_EDGE
+            self.edge_widths[i] = 3.0
+        for i in self.path_nodes - new_nodes:
+            self.node_colors[i] = BASE_NODE
+        for i in new_nodes - self.path_nodes:
+            self.node_colors[i] = PATH_NODE
+        self.path_edges, self.path_nodes = new_edges, new_nodes
+
+        self.edges.set_color(self.edge_colors)
+        self.edges.set_linewidth(self.edge_widths)
+        self.nodes.set_facecolor(self.node_colors)
+
+        if not self.show_all_labels:
+            for label in self.path_labels:
+                label.remove()
+            self.path_labels = [
+                self.ax.text(*self.positions[self.cities[i]], self.cities[i],
+                             fontsize=7, zorder=3)
+                for i in new_nodes]
+        self.canvas.draw_idle()
@@ -0,0 +1,167 @@
+import heapq
+from math import inf
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional: sem ele as matrizes são listas de listas
+    np = None
+
+OBJECTIVES = {"toll": 0, "fuel": 1, "distance": 2}
+FLOYD_MAX_NODES = 500
+# O Floyd–Warshall calcula todos os pares em O(V³): só compensa quando as
+# origens cobrem uma boa parte do grafo (senão um Dijkstra por origem basta)
+FLOYD_MIN_ORIGIN_SHARE = 0.5
+
+
+def _matrix(rows, dtype=float):
+    if np is None:
+        return rows
+    return np.array(rows, dtype=dtype)
+
+
+def _one_to_many(adjacency_list, source, targets, index):
+    """Dijkstra a partir de source no objetivo index, parando quando todos os
+    destinos estão fechados; acumula também os três custos do caminho escolhido"""
+    best = {source: 0.0}
+    totals = {source: (0.0, 0.0, 0.0)}
+    parent = {source: None}
+    remaining = set(targets)
+    remaining.discard(source)
+    closed = set()
+    heap = [(0.0, source)]
+
+    while heap and remaining:
+        d, node = heapq.heappop(heap)
+        if node in closed:
+            continue
+        closed.add(node)
+        remaining.discard(node)
+        toll, fuel, dist = totals[node]
+        for neighbor, costs in adjacency_list.get(node, []):
+            nd = d + costs[index]
+            if nd < best.get(neighbor, inf):
+                best[neighbor] = nd
+                totals[neighbor] = (toll + costs[0], fuel + costs[1], dist + costs[2])
+                parent[neighbor] = node
+                heapq.heappush(heap, (nd, neighbor))
+    return totals, parent, closed | {source}
+
+
+def _dijkstra_backend(adjacency_list, origins, destinations, index, nodes, return_predecessors):
+    node_index = {name: i for i, name in enumerate(nodes)}
+    tables = ([], [], [])
+    predecessors = []
+    for origin in origins:
+        totals, parent, settled = _one_to_many(adjacency_list, origin, destinations, index)
+        for k in range(3):
+            tables[k].append([totals[d][k] if d in settled and d in totals else inf
+                              for d in destinations])
+        if return_predecessors:
+            row = [-1] * len(nodes)
+            for node, p in parent.items():
+                if p is not None:
+                    row[node_index[node]] = node_index[p]
+            predecessors.append(row)
+    return tables, predecessors
+
+
+def _floyd_backend(adjacency_list, origins, destinations, index, nodes):
+    """Floyd–Warshall vetorizado (min-plus) sobre a matriz densa de todos os nós"""
+    n = len(nodes)
+    node_index = {name: i for i, name in enumerate(nodes)}
+    cost = np.full((n, n), inf)
+    extra = np.zeros((3, n, n))
+    pred = np.full((n, n), -1, dtype=np.int64)
+    np.fill_diagonal(cost, 0.0)
+
+    for node, neighbors in adjacency_list.items():
+        i = node_index[node]
+        for neighbor, costs in neighbors:
+            j = node_index[neighbor]
+            if i != j and costs[index] < cost[i, j]:
+                cost[i, j] = costs[index]
+                extra[:, i, j] = costs
+                pred[i, j] = i
+
+    for k in range(n):
+        candidate = cost[:, k, None] + cost[None, k, :]
+        better = candidate < cost
+        if not better.any():
+            continue
+        cost = np.where(better, candidate, cost)
+        for c in range(3):
+            extra[c] = np.where(better, extra[c][:, k, None] + extra[c][None, k, :], extra[c])
+        pred = np.where(better, pred[k][None, :], pred)
+
+    rows = [node_index[o] for o in origins]
+    cols = [node_index[d] for d in destinations]
+    sub = np.ix_(rows, cols)
+    unreachable = ~np.isfinite(cost[sub])
+    tables = []
+    for c in range(3):
+        values = extra[c][sub].copy()
+        values[unreachable] = inf
+        tables.append(values)
+    return tables, pred[rows]
+
+
+def route_matrix(adjacency_list, origins, destinations, objective="distance",
+                 backend="auto", return_predecessors=False):
+    """Matriz origens x destinos de custos de rota.
+
+    O caminho de cada par minimiza o objetivo ("distance", "toll" ou "fuel") e a
+    matriz devolve os três totais desse caminho. Backends: "dijkstra" (um
+    Dijkstra um-para-muitos por origem) ou "floyd" (Floyd–Warshall com NumPy,
+    indicado para grafos pequenos e densos); "auto" só escolhe o Floyd em grafos
+    pequenos quando as origens são pelo menos metade dos nós.
+
+    Devolve um dicionário com "distance", "toll", "fuel" e "nodes"; com
+    return_predecessors=True inclui "predecessors" (linha por origem, com o id
+    do predecessor de cada nó ou -1), usado por recover_path.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Objetivo desconhecido: {objective}")
+    index = OBJECTIVES[objective]
+    origins, destinations = list(origins), list(destinations)
+    for city in origins + destinations:
+        if city not in adjacency_list:
+            raise KeyError(f"Cidade desconhecida: {city}")
+
+    nodes = list(adjacency_list)
+    if backend == "auto":
+        all_pairs = len(set(origins)) >= FLOYD_MIN_ORIGIN_SHARE * len(nodes)
+        small = len(nodes) <= FLOYD_MAX_NODES
+        backend = "floyd" if np is not None and small and all_pairs else "dijkstra"
+
+    if backend == "floyd":
+        if np is None:
+            raise RuntimeError("O backend 'floyd' precisa do NumPy.")
+        tables, predecessors = _floyd_backend(adjacency_list, origins, destinations, index, nodes)
+    elif backend == "dijkstra":
+        tables, predecessors = _dijkstra_backend(
+            adjacency_list, origins, destinations, index, nodes, return_predecessors)
+        tables = [_matrix(t) for t in tables]
+        predecessors = _matrix(predecessors, dtype=int)
+    else:
+        raise ValueError(f"Backend desconhecido: {backend}")
+
+    result = {"nodes": nodes, "origins": origins, "destinations": destinations,
+              "toll": tables[0], "fuel": tables[1], "distance": tables[2]}
+    if return_predecessors:
+        result["predecessors"] = predecessors
+    return result
+
+
+def recover_path(result, origin, destination):
+    """Reconstrói o caminho origem -> destino a partir da matriz de predecessores"""
+    nodes = result["nodes"]
+    row = result["predecessors"][result["origins"].index(origin)]
+    target = nodes.index(destination)
+    source = nodes.index(origin)
+    path = [target]
+    while path[-1] != source:
+        previous = int(row[path[-1]])
+        if previous < 0 or len(path) > len(nodes):
+            return None
+        path.append(previous)
+    return [nodes[i] for i in reversed(path)]
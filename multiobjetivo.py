@@ -0,0 +1,174 @@
+import heapq
+from itertools import count
+from math import inf
+
+from cache_heuristica import HEURISTIC_CACHE
+from landmarks import dijkstra, reverse_adjacency
+
+
+def dominates(a, b, epsilon=0.0):
+    """a (epsilon-)domina b: a_i <= (1 + epsilon) * b_i em todos os objetivos"""
+    factor = 1.0 + epsilon
+    return all(x <= y * factor for x, y in zip(a, b))
+
+
+def objective_heuristics(adjacency_list, goal, heuristic_cache=HEURISTIC_CACHE):
+    """Heurísticas admissíveis por objetivo: distância exata ao objetivo em
+    portagem, combustível e distância (Dijkstra no grafo invertido)"""
+    def compute(_):
+        reverse = reverse_adjacency(adjacency_list)
+        tables = [dijkstra(reverse, goal, i) for i in range(3)]
+        return {node: (tables[0][node], tables[1][node], tables[2][node])
+                for node in tables[2]}
+
+    if heuristic_cache is None:
+        return compute(None)
+    return heuristic_cache.get_or_compute(adjacency_list, ("pareto", goal), compute)
+
+
+def pareto_routes(adjacency_list, start, goal, max_front=20, epsilon=0.0,
+                  heuristic_cache=HEURISTIC_CACHE):
+    """NAMOA* sobre (portagem, combustível, distância).
+
+    Devolve a frente de Pareto [(caminho, portagem, combustível, distância)],
+    limitada a max_front rotas. Com epsilon > 0 descarta rotas que sejam
+    epsilon-dominadas por outra já encontrada (frente mais pequena e mais rápida).
+    """
+    h = objective_heuristics(adjacency_list, goal, heuristic_cache)
+    if start not in h:
+        return []
+
+    counter = count()
+    # Etiqueta: [custos g, nó, etiqueta pai, viva]
+    root = [(0.0, 0.0, 0.0), start, None, True]
+    open_heap = [(h[start], next(counter), root)]
+    labels = {start: [root]}      # etiquetas não dominadas (abertas ou fechadas) por nó
+    solutions = []
+
+    while open_heap and len(solutions) < max_front:
+        f, _, label = heapq.heappop(open_heap)
+        if not label[3]:
+            continue
+        if any(dominates(s[0], f, epsilon) for s in solutions):
+            continue
+
+        g, node = label[0], label[1]
+        if node == goal:
+            solutions.append(label)
+            continue
+
+        for neighbor, costs in adjacency_list.get(node, []):
+            hn = h.get(neighbor)
+            if hn is None:
+                continue
+            new_g = (g[0] + costs[0], g[1] + costs[1], g[2] + costs[2])
+            new_f = (new_g[0] + hn[0], new_g[1] + hn[1], new_g[2] + hn[2])
+            if any(dominates(s[0], new_f, epsilon) for s in solutions):
+                continue
+
+            existing = labels.setdefault(neighbor, [])
+            if any(dominates(other[0], new_g) for other in existing):
+                continue
+            for other in existing:
+                if dominates(new_g, other[0]):
+                    other[3] = False
+            existing[:] = [other for other in existing if other[3]]
+
+            child = [new_g, neighbor, label, True]
+            existing.append(child)
+            heapq.heappush(open_heap, (new_f, next(counter), child))
+
+    routes = []
+    for label in solutions:
+        toll, fuel, dist = label[0]
+        path = []
+        while label is not None:
+            path.append(label[1])
+            label = label[2]
+        path.reverse()
+        routes.append((path, toll, fuel, dist))
+    return sorted(routes, key=lambda r: (r[3], r[1], r[2]))
+
+
+def constrained_routes(adjacency_list, start, goal, max_toll=inf, max_fuel=inf, k=1,
+                       heuristic_cache=HEURISTIC_CACHE, stats=None, on_expand=None):
+    """Caminhos mais curtos com orçamento de portagem e combustível.
+
+    Pesquisa por etiquetas ordenada por distância + h_distância (empates por
+    portagem e depois combustível, também com h). Uma etiqueta é cortada se
+    já não couber no orçamento mesmo com o mínimo possível de
+    portagem/combustível até ao objetivo (Dijkstra invertido por recurso), ou
+    se outra etiqueta do mesmo nó a dominar. As etiquetas chegam ao objetivo
+    por essa ordem, por isso a primeira é ótima e nenhuma é dominada por uma
+    seguinte; devolve até k rotas viáveis e não dominadas
+    [(caminho, portagem, combustível, distância)].
+    Se nem o mínimo de portagem ou de combustível cabe no orçamento, a
+    consulta é inviável e a resposta ([]) é imediata.
+    """
+    h = objective_heuristics(adjacency_list, goal, heuristic_cache)
+    if start not in h:
+        return []
+    slack = 1e-9
+    if h[start][0] > max_toll + slack or h[start][1] > max_fuel + slack:
+        return []
+
+    counter = count()
+    # Etiqueta: [custos g, nó, etiqueta pai, viva]
+    root = [(0.0, 0.0, 0.0), start, None, True]
+    open_heap = [((h[start][2], h[start][0], h[start][1]), next(counter), root)]
+    labels = {start: [root]}
+    solutions = []
+
+    while open_heap and len(solutions) < k:
+        _, _, label = heapq.heappop(open_heap)
+        if stats is not None:
+            stats.heap_pops += 1
+        if not label[3]:
+            if stats is not None:
+                stats.stale_pops += 1
+            continue
+        g, node = label[0], label[1]
+        if stats is not None:
+            stats.expanded += 1
+        if on_expand is not None:
+            on_expand(node)
+        if node == goal:
+            solutions.append(label)
+            continue
+
+        for neighbor, costs in adjacency_list.get(node, []):
+            hn = h.get(neighbor)
+            if stats is not None:
+                stats.relaxations += 1
+            if hn is None:
+                continue
+            new_g = (g[0] + costs[0], g[1] + costs[1], g[2] + costs[2])
+            if new_g[0] + hn[0] > max_toll + slack or new_g[1] + hn[1] > max_fuel + slack:
+                continue
+
+            existing = labels.setdefault(neighbor, [])
+            if any(dominates(other[0], new_g) for other in existing):
+                continue
+            for other in existing:
+                if dominates(new_g, other[0]):
+                    other[3] = False
+            existing[:] = [other for other in existing if other[3]]
+
+            child = [new_g, neighbor, label, True]
+            existing.append(child)
+            f = (new_g[2] + hn[2], new_g[0] + hn[0], new_g[1] + hn[1])
+            heapq.heappush(open_heap, (f, next(counter), child))
+            if stats is not None:
+                stats.heap_pushes += 1
+                stats.observe_open(len(open_heap))
+
+    routes = []
+    for label in solutions:
+        toll, fuel, dist = label[0]
+        path = []
+        while label is not None:
+            path.append(label[1])
+            label = label[2]
+        path.reverse()
+        routes.append((path, toll, fuel, dist))
+    return routes
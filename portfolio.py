@@ -0,0 +1,275 @@
+"""Modo portfólio: A*, D* Lite e LRTA* correm em paralelo e ganha o primeiro.
+
+Cada planeador tem um processo próprio que abre o snapshot do grafo (mmap,
+páginas partilhadas) uma vez. Numa corrida todos recebem a mesma consulta;
+a primeira resposta de um planeador ótimo (A*, ou D* Lite com k=1) cujo custo
+confere com as arestas do grafo é devolvida e os restantes são cancelados
+(cooperativamente, no callback on_expand). Sem resposta ótima, fica a melhor
+recebida até ao prazo. O vencedor de cada classe de consulta é registado e,
+com adaptive=True, as consultas seguintes dessa classe vão direto ao provável
+vencedor.
+"""
+import json
+import math
+import multiprocessing
+import queue
+import threading
+import time
+
+from CODIGOparacsv import Graph as AStar_Graph
+from DinamicAStar import Graph as DStar_Graph
+from LRTA import Graph as LRTA_Graph
+from estatisticas import SearchCancelled, SearchStats
+from grafo_compacto import load_graph_cached
+
+PLANNERS = {"A*": AStar_Graph, "D*": DStar_Graph, "LRTA*": LRTA_Graph}
+
+# Intervalo (s) entre verificações enquanto se espera pelos trabalhadores
+POLL_INTERVAL = 0.05
+# Fração do prazo dada ao provável vencedor; o resto fica para a corrida completa
+ROUTED_SHARE = 0.5
+
+
+def is_optimal(planner, k):
+    """O planeador garante a resposta ótima? (Yen é exato; D* Lite só dá um caminho)"""
+    return planner == "A*" or (planner == "D*" and k == 1)
+
+
+def _race_worker(planner, csv_filename, dedup, tasks, results, current):
+    graph_data = load_graph_cached(csv_filename, dedup=dedup)
+    planner_class = PLANNERS[planner]
+    results.put((0, planner, None, "ready", 0.0))
+    while True:
+        task = tasks.recv()
+        if task is None:
+            return
+        query_id, start, goal, k = task
+        if current.value != query_id:
+            continue   # a corrida já acabou antes de esta tarefa chegar
+
+        def on_expand(node):
+            if current.value != query_id:
+                raise SearchCancelled()
+
+        graph = planner_class(graph_data)
+        graph.stats = SearchStats()
+        graph.on_expand = on_expand
+        started = time.perf_counter()
+        try:
+            paths = graph.find_top_paths(start, goal, k)
+        except SearchCancelled:
+            continue
+        except Exception as e:  # o trabalhador sobrevive a consultas inválidas
+            results.put((query_id, planner, None, repr(e), time.perf_counter() - started))
+            continue
+        results.put((query_id, planner, paths, graph.stats.as_dict(),
+                     time.perf_counter() - started))
+
+
+class Portfolio:
+    def __init__(self, csv_filename, planners=tuple(PLANNERS), dedup="pareto",
+                 record_file=None, min_samples=5, confidence=0.7):
+        self.graph = load_graph_cached(csv_filename, dedup=dedup)
+        if self.graph is None:
+            raise FileNotFoundError(csv_filename)
+        self.planners = list(planners)
+        self.record_file = record_file
+        self.min_samples = min_samples
+        self.confidence = confidence
+        self.wins = self._load_wins()
+        self.lock = threading.Lock()
+        self.query_id = 0
+
+        # spawn: a GUI arranca o portfólio a partir de uma thread, e fazer fork
+        # de um processo com threads (e Tk) não é seguro
+        context = multiprocessing.get_context("spawn")
+        self.current = context.RawValue('q', 0)
+        self.results = context.Queue()
+        self.tasks = {}
+        self.processes = []
+        for planner in self.planners:
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(
+                target=_race_worker, daemon=True,
+                args=(planner, csv_filename, dedup, receiver, self.results, self.current))
+            process.start()
+            self.tasks[planner] = sender
+            self.processes.append(process)
+
+        # O arranque (imports + snapshot) não deve contar para o prazo da 1.ª corrida
+        for _ in self.processes:
+            self.results.get(timeout=60)
+
+    def close(self):
+        self.current.value = 0
+        for sender in self.tasks.values():
+            try:
+                sender.send(None)
+            except OSError:
+                pass
+        for process in self.processes:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Registo dos vencedores por classe de consulta
+
+    def query_class(self, start, goal, k):
+        """Classe barata (O(1)): k único ou vários e escalão de grau das duas cidades"""
+        def degree_band(city):
+            degree = len(self.graph[city]) if city in self.graph else 0
+            return int(math.log2(degree + 1))
+        return f"k{'1' if k == 1 else 'n'}|{degree_band(start)}|{degree_band(goal)}"
+
+    def _load_wins(self):
+        if self.record_file is None:
+            return {}
+        try:
+            with open(self.record_file, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _record_win(self, query_class, planner):
+        counts = self.wins.setdefault(query_class, {})
+        counts[planner] = counts.get(planner, 0) + 1
+        if self.record_file is not None:
+            with open(self.record_file, "w", encoding="utf-8") as f:
+                json.dump(self.wins, f, indent=2, ensure_ascii=False)
+
+    def likely_winner(self, query_class):
+        """Planeador que ganha a classe com confiança suficiente (ou None)"""
+        counts = self.wins.get(query_class, {})
+        total = sum(counts.values())
+        if total < self.min_samples:
+            return None
+        planner, wins = max(counts.items(), key=lambda item: item[1])
+        if wins / total < self.confidence or planner not in self.tasks:
+            return None
+        return planner
+
+    # Corrida
+
+    def verify(self, path, distance):
+        """Confere o caminho com as arestas do grafo (existem e somam a distância)"""
+        total = 0.0
+        for u, v in zip(path, path[1:]):
+            costs = [c[2] for neighbor, c in self.graph.get(u, []) if neighbor == v]
+            if not costs:
+                return False
+            total += min(costs)
+        return math.isclose(total, distance, rel_tol=1e-9, abs_tol=1e-6)
+
+    def _run(self, planners, start, goal, k, expires, on_poll):
+        self.query_id += 1
+        query_id = self.query_id
+        self.current.value = query_id
+        for planner in planners:
+            self.tasks[planner].send((query_id, start, goal, k))
+
+        received = {}
+        best = None
+        try:
+            while len(received) < len(planners):
+                timeout = expires - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    message = self.results.get(timeout=min(timeout, POLL_INTERVAL))
+                except queue.Empty:
+                    if on_poll is not None:
+                        on_poll()
+                    continue
+                message_id, planner, paths, info, elapsed = message
+                if message_id != query_id:
+                    continue   # resposta atrasada de uma corrida anterior
+
+                entry = {"elapsed_ms": elapsed * 1000}
+                if paths is None:
+                    entry["error"] = info
+                else:
+                    entry["stats"] = info
+                    entry["distance"] = paths[0][3] if paths else None
+                    entry["verified"] = all(self.verify(p[0], p[3]) for p in paths)
+                received[planner] = entry
+                if paths is None or not entry["verified"]:
+                    continue
+
+                optimal = is_optimal(planner, k)
+                if best is None or (paths and (not best[1] or paths[0][3] < best[1][0][3])):
+                    best = (planner, paths, optimal, info)
+                if optimal:
+                    best = (planner, paths, True, info)
+                    break
+        finally:
+            # Cancela quem ainda estiver a pesquisar
+            self.current.value = 0
+        return best, received
+
+    def race(self, start, goal, k=1, deadline=1.0, adaptive=False, on_poll=None):
+        """Corre a consulta no portfólio e devolve um dicionário com o resultado.
+
+        Chaves: paths, winner, optimal, elapsed_ms, routed (True se foi direto ao
+        provável vencedor), query_class, stats (do vencedor) e results (por
+        planeador). A previsão só tem ROUTED_SHARE do prazo, para que a corrida
+        com todos, se ela falhar, ainda tenha tempo até ao fim do prazo.
+        on_poll(), se dado, é chamado enquanto se espera e pode levantar uma
+        exceção para abortar a corrida.
+        """
+        with self.lock:
+            started = time.perf_counter()
+            expires = started + deadline
+            query_class = self.query_class(start, goal, k)
+
+            routed = self.likely_winner(query_class) if adaptive else None
+            best, received = None, {}
+            if routed is not None:
+                best, received = self._run([routed], start, goal, k,
+                                           started + ROUTED_SHARE * deadline, on_poll)
+            if best is None:
+                # Sem previsão (ou a previsão falhou): corrida com todos
+                remaining = [p for p in self.planners if p not in received]
+                best, more = self._run(remaining, start, goal, k, expires, on_poll)
+                received.update(more)
+                routed = None
+
+            if best is not None and routed is None:
+                self._record_win(query_class, best[0])
+            return {
+                "paths": best[1] if best else [],
+                "winner": best[0] if best else None,
+                "optimal": best[2] if best else False,
+                "stats": best[3] if best else None,
+                "elapsed_ms": (time.perf_counter() - started) * 1000,
+                "routed": routed is not None,
+                "query_class": query_class,
+                "results": received,
+            }
+
+
+class PortfolioPlanner:
+    """Adaptador com a interface dos Graph (find_top_paths) para a GUI"""
+
+    def __init__(self, portfolio, deadline=2.0, adaptive=True):
+        self.portfolio = portfolio
+        self.deadline = deadline
+        self.adaptive = adaptive
+        self.stats = None
+        self.on_expand = None
+        self.last_result = None
+
+    def find_top_paths(self, start, goal, num_paths=5, max_attempts=30, with_stats=False):
+        # Enquanto espera, o callback de progresso da GUI pode cancelar a corrida
+        on_poll = None if self.on_expand is None else (lambda: self.on_expand(None))
+        result = self.portfolio.race(start, goal, num_paths, self.deadline, self.adaptive, on_poll)
+        self.last_result = result
+        self.stats = SearchStats()
+        for name, value in (result["stats"] or {}).items():
+            setattr(self.stats, name, value)
+        return (result["paths"], self.stats) if with_stats else result["paths"]
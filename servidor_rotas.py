@@ -0,0 +1,359 @@
+"""Serviço local de rotas (HTTP/JSON sobre asyncio) com estado quente em memória.
+
+O grafo é carregado uma vez; as pesquisas correm num ProcessPoolExecutor cujos
+trabalhadores mantêm o snapshot e as caches abertos entre pedidos, por isso o
+ciclo de eventos nunca bloqueia. Pedidos /route concorrentes são agrupados em
+micro-lotes (janela de alguns ms) e pedidos repetidos no mesmo lote só são
+calculados uma vez.
+
+    python servidor_rotas.py --graph cities_nodes_special.csv --port 8765
+    curl 'http://127.0.0.1:8765/route?origin=Seville&destination=Helsinki&k=3'
+    curl -d '{"origins": ["Seville"], "destinations": ["Helsinki"]}' http://127.0.0.1:8765/matrix
+    curl http://127.0.0.1:8765/stats
+
+Endpoints:
+    GET/POST /route   origin, destination, algorithm (A*, LRTA*, D*, CH), k
+    POST     /matrix  origins, destinations, objective (distance, toll, fuel)
+    GET      /stats   contadores do serviço e da cache de rotas
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+import batch_rotas
+from batch_rotas import PLANNERS, init_worker, run_chunk
+from cache_rotas import RouteCache
+from carregador import DEDUP_POLICIES
+from grafo_compacto import load_graph_cached
+from matriz_rotas import OBJECTIVES, route_matrix
+
+MAX_BODY = 1024 * 1024
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def run_matrix(origins, destinations, objective):
+    """Corre num trabalhador: matriz de custos sobre o grafo já carregado"""
+    matrix = route_matrix(batch_rotas._graph, origins, destinations, objective)
+
+    def clean(rows):
+        # JSON não tem infinito: pares sem caminho ficam a null
+        return [[None if math.isinf(value) else float(value) for value in row] for row in rows]
+
+    return {"origins": origins, "destinations": destinations, "objective": objective,
+            "distance": clean(matrix["distance"]), "toll": clean(matrix["toll"]),
+            "fuel": clean(matrix["fuel"])}
+
+
+class MicroBatcher:
+    """Junta pedidos de rota que chegam dentro de `window` segundos num só trabalho"""
+
+    def __init__(self, executor, window=0.005, max_batch=64):
+        self.executor = executor
+        self.window = window
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue()
+        self.dispatching = set()   # o loop só guarda referências fracas às tarefas
+        self.batches = 0
+        self.batched_queries = 0
+        self.shared_queries = 0
+
+    async def submit(self, query):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((query, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # O lote segue para o pool enquanto se recolhe o seguinte
+            task = asyncio.create_task(self.dispatch(batch))
+            self.dispatching.add(task)
+            task.add_done_callback(self.dispatching.discard)
+
+    async def dispatch(self, batch):
+        waiters = {}
+        for query, future in batch:
+            key = (query["origin"], query["destination"], query["algorithm"], query["k"])
+            waiters.setdefault(key, (query, []))[1].append(future)
+        self.batches += 1
+        self.batched_queries += len(batch)
+        self.shared_queries += len(batch) - len(waiters)
+
+        groups = list(waiters.values())
+        chunk = [(index, query) for index, (query, _) in enumerate(groups)]
+        try:
+            records = await asyncio.get_running_loop().run_in_executor(
+                self.executor, run_chunk, chunk)
+        except Exception as e:
+            for _, futures in groups:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        for record in records:
+            for future in groups[record["index"]][1]:
+                if not future.done():
+                    future.set_result(record)
+
+
+class RouteService:
+    def __init__(self, csv_filename, workers=None, dedup="pareto", window=0.005,
+                 max_batch=64, route_cache=None):
+        self.graph = load_graph_cached(csv_filename, dedup=dedup)
+        if self.graph is None:
+            raise FileNotFoundError(csv_filename)
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(self.workers, initializer=init_worker,
+                                            initargs=(csv_filename, dedup))
+        self.batcher = MicroBatcher(self.executor, window, max_batch)
+        # Acertos em memória respondem sem sair do ciclo de eventos (ver cache_call)
+        self.route_cache = route_cache if route_cache is not None else RouteCache()
+        self.started = time.time()
+        self.requests = {"/route": 0, "/matrix": 0, "/stats": 0}
+        self.errors = 0
+        self.route_time = 0.0
+        self.routed = 0
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+        self.route_cache.close()
+
+    async def cache_call(self, method, *args):
+        """get/put da cache de rotas; com base sqlite correm numa thread do loop,
+        para que a escrita (ou a espera pelo lock de outro processo) não bloqueie"""
+        if self.route_cache.db is None:
+            return method(*args)
+        return await asyncio.get_running_loop().run_in_executor(None, method, *args)
+
+    def parse_route(self, params):
+        try:
+            query = {"origin": params["origin"], "destination": params["destination"],
+                     "algorithm": params.get("algorithm", "A*"), "k": int(params.get("k", 5))}
+        except KeyError as e:
+            raise BadRequest(f"Falta o parâmetro {e.args[0]}")
+        except (TypeError, ValueError):
+            raise BadRequest("k tem de ser um inteiro")
+        for name in ("origin", "destination", "algorithm"):
+            if not isinstance(query[name], str):
+                raise BadRequest(f"{name} tem de ser uma string")
+        if isinstance(params.get("k"), bool):
+            raise BadRequest("k tem de ser um inteiro")
+        if query["algorithm"] not in PLANNERS:
+            raise BadRequest(f"Algoritmo desconhecido: {query['algorithm']}")
+        if query["k"] < 1:
+            raise BadRequest("k tem de ser positivo")
+        return query
+
+    async def route(self, params):
+        query = self.parse_route(params)
+        if query["origin"] not in self.graph or query["destination"] not in self.graph:
+            return 404, {**query, "error": "Uma ou ambas as cidades não existem no grafo."}
+        started = time.perf_counter()
+        key = self.route_cache.key(query["algorithm"], query["origin"], query["destination"],
+                                   query["k"], "distance", self.graph)
+        paths = await self.cache_call(self.route_cache.get, key)
+        if paths is not None:
+            record = {**query, "paths": [{"path": path, "toll": toll, "fuel": fuel, "distance": dist}
+                                         for path, toll, fuel, dist in paths],
+                      "cached": True}
+        else:
+            record = await self.batcher.submit(query)
+            record = {name: value for name, value in record.items() if name != "index"}
+            if "error" in record:
+                # A consulta já foi validada: um erro do planeador é uma falha interna
+                return 500, record
+            await self.cache_call(self.route_cache.put, key,
+                                  [(p["path"], p["toll"], p["fuel"], p["distance"])
+                                   for p in record["paths"]])
+            record["cached"] = False
+        record["elapsed_ms"] = (time.perf_counter() - started) * 1000
+        self.route_time += time.perf_counter() - started
+        self.routed += 1
+        return 200, record
+
+    async def matrix(self, params):
+        try:
+            origins, destinations = params["origins"], params["destinations"]
+        except KeyError as e:
+            raise BadRequest(f"Falta o parâmetro {e.args[0]}")
+        for name, cities in (("origins", origins), ("destinations", destinations)):
+            # Uma string isolada seria partida em letras por list()
+            if not isinstance(cities, list) or not all(isinstance(c, str) for c in cities):
+                raise BadRequest(f"{name} tem de ser uma lista de cidades")
+        objective = params.get("objective", "distance")
+        if not isinstance(objective, str) or objective not in OBJECTIVES:
+            raise BadRequest(f"Objetivo desconhecido: {objective}")
+        missing = [city for city in origins + destinations if city not in self.graph]
+        if missing:
+            return 404, {"error": f"Cidades desconhecidas: {', '.join(missing)}"}
+        return 200, await asyncio.get_running_loop().run_in_executor(
+            self.executor, run_matrix, origins, destinations, objective)
+
+    def stats(self):
+        batcher = self.batcher
+        routed = self.routed
+        return {
+            "uptime_s": time.time() - self.started,
+            "workers": self.workers,
+            "nodes": len(self.graph),
+            "requests": self.requests,
+            "errors": self.errors,
+            "mean_route_ms": self.route_time / routed * 1000 if routed else 0.0,
+            "batches": batcher.batches,
+            "mean_batch_size": batcher.batched_queries / batcher.batches if batcher.batches else 0.0,
+            "shared_queries": batcher.shared_queries,
+            "route_cache": self.route_cache.stats(),
+        }
+
+    async def handle(self, method, target, body):
+        url = urlsplit(target)
+        if url.path not in self.requests:
+            return 404, {"error": f"Endpoint desconhecido: {url.path}"}
+        self.requests[url.path] += 1
+        if url.path == "/stats":
+            return 200, self.stats()
+
+        params = dict(parse_qsl(url.query))
+        if method == "POST" and body:
+            try:
+                data = json.loads(body)
+            except ValueError as e:
+                raise BadRequest(f"JSON inválido: {e}")
+            if not isinstance(data, dict):
+                raise BadRequest("O corpo tem de ser um objeto JSON")
+            params.update(data)
+        elif method != "GET":
+            return 405, {"error": f"Método não suportado: {method}"}
+
+        if url.path == "/route":
+            return await self.route(params)
+        return await self.matrix(params)
+
+    async def serve_client(self, reader, writer):
+        """Um cliente HTTP/1.1 (mantém a ligação aberta enquanto o cliente quiser)"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    length = int(headers.get("content-length", 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    # Sem tamanho válido não se sabe onde o corpo acaba: fecha a ligação
+                    status, payload = 400, {"error": "Content-Length inválido"}
+                    keep_alive = False
+                elif length > MAX_BODY:
+                    status, payload = 413, {"error": "Pedido demasiado grande"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    keep_alive = (headers.get("connection", "").lower() != "close"
+                                  and version == "HTTP/1.1")
+                    try:
+                        status, payload = await self.handle(method.upper(), target, body)
+                    except BadRequest as e:
+                        status, payload = 400, {"error": str(e)}
+                    except Exception as e:  # o serviço continua a responder aos outros
+                        status, payload = 500, {"error": repr(e)}
+                if status >= 400:
+                    self.errors += 1
+
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1")
+                    + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(service, host="127.0.0.1", port=8765, unix_path=None):
+    batcher_task = asyncio.create_task(service.batcher.run())
+    if unix_path is not None:
+        server = await asyncio.start_unix_server(service.serve_client, path=unix_path)
+        where = unix_path
+    else:
+        server = await asyncio.start_server(service.serve_client, host, port)
+        where = ", ".join(f"http://{s.getsockname()[0]}:{s.getsockname()[1]}" for s in server.sockets)
+    print(f"A servir rotas em {where}", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batcher_task.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serviço local de rotas (HTTP/JSON)")
+    parser.add_argument("--graph", default="cities_nodes_special.csv", help="CSV do grafo")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", default=None, help="socket Unix em vez de TCP")
+    parser.add_argument("--workers", type=int, default=None, help="processos (omissão: nº de CPUs)")
+    parser.add_argument("--batch-window", type=float, default=5.0,
+                        help="janela de micro-lote em ms")
+    parser.add_argument("--max-batch", type=int, default=64, help="pedidos por micro-lote")
+    parser.add_argument("--dedup", default="pareto", choices=("none", *DEDUP_POLICIES),
+                        help="política de deduplicação de arestas ('none' para desligar; "
+                             "'pareto' mantém as variantes de custos não dominadas)")
+    parser.add_argument("--route-cache", default=None,
+                        help="base sqlite para reaproveitar resultados entre execuções")
+    parser.add_argument("--cache-ttl", type=float, default=None,
+                        help="validade (s) dos resultados na cache de rotas")
+    args = parser.parse_args(argv)
+
+    dedup = None if args.dedup == "none" else args.dedup
+    service = RouteService(args.graph, args.workers, dedup, args.batch_window / 1000,
+                           args.max_batch, RouteCache(ttl=args.cache_ttl, path=args.route_cache))
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()